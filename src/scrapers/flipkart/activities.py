@@ -1,9 +1,11 @@
 import os
+import asyncio
 import logging
 from temporalio import activity
 from selenium.webdriver.remote.webelement import WebElement  # for type hints
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 import re
 import csv
 from typing import Any
@@ -14,14 +16,50 @@ from selenium_helper.elements_helper import ElementsHelper
 from selenium_helper.elements_interactor import search_and_enter_text
 from utils.debug_helper import log_and_handle_errors
 from utils.formatter import format_webelements_to_divs
-from utils.currency import format_currency, convert_currency
+from utils.currency import format_currency, get_currency_rates, convert_currency_with_rates
 from utils.sql_helper import get_or_create_id
-from .config import FLIPKART_URL, PRODUCT_TITLE_DIV_XPATH_LOCATOR, PRODUCT_PRICE_DIV_XPATH_LOCATOR
+from utils.schema_manager import SchemaManager, is_ensured
+from utils.price_analytics import PriceAnalytics, refresh_for_batch_async
+from utils import async_sql_helper
+from utils.async_sql_helper import AsyncConnectionPool, AsyncBatchWriter
+from utils.snapshot_store import SnapshotStore
+from .config import FLIPKART_URL, PRODUCT_TITLE_DIV_XPATH_LOCATOR, PRODUCT_PRICE_DIV_XPATH_LOCATOR, ASYNC_DB_POOL_SIZE, ASYNC_DB_MAX_BATCH_ROWS, ASYNC_DB_FLUSH_DELAY_SECONDS, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_TOTAL_BYTES
+
+PRICE_ROW_TEMPLATE = "(%s, %s, %s::numeric, %s::timestamptz)"
+
+def _insert_sql(product_type: str) -> str:
+    # rows that a committed earlier attempt already wrote hit the observation key and are skipped, see SchemaManager._create_indexes
+    return f"INSERT INTO {product_type} (website_id, product_name, price_usd, datetime) VALUES %s ON CONFLICT DO NOTHING"
+
+def _upsert_changed_sql(product_type: str) -> str:
+    return f"""
+        WITH incoming (website_id, product_name, price_usd, datetime) AS (VALUES %s),
+        changed AS (
+            INSERT INTO {product_type}_latest AS latest (website_id, product_name, price_usd, datetime)
+            SELECT DISTINCT ON (website_id, product_name) website_id, product_name, price_usd, datetime
+            FROM incoming
+            ORDER BY website_id, product_name, datetime DESC
+            ON CONFLICT (website_id, product_name) DO UPDATE
+            SET price_usd = EXCLUDED.price_usd, datetime = EXCLUDED.datetime
+            WHERE latest.price_usd IS DISTINCT FROM EXCLUDED.price_usd
+            RETURNING latest.website_id, latest.product_name, latest.price_usd, latest.datetime
+        )
+        INSERT INTO {product_type} (website_id, product_name, price_usd, datetime)
+        SELECT website_id, product_name, price_usd, datetime FROM changed
+    """
+
+def _read_csv_rows(csv_file_path: str) -> list[dict[str, str]]:
+    with open(csv_file_path) as f:
+        return list(csv.DictReader(f))
+
+def _to_price_rows(csv_rows: list[dict[str, str]], website_ids: dict[str, int]) -> list[tuple[int, str, str, str]]:
+    return [(website_ids[row['website_name']], row['product_name'], row['price_usd'], row['datetime']) for row in csv_rows]
 
 class _FetchDataHelper:
-    def __init__(self, headless: bool):
-        self.driver = Driver('chrome', headless=headless).get_driver()
-        self.elements_helper = ElementsHelper(self.driver)
+    def __init__(self, headless: bool, use_driver: bool = True):
+        # replaying snapshots only needs the formatting and filtering steps, so it skips starting a browser
+        self.driver = Driver('chrome', headless=headless).get_driver() if use_driver else None
+        self.elements_helper = ElementsHelper(self.driver) if use_driver else None
     
     def visit_url(self, url: str) -> None:
         self.driver.get(url)
@@ -51,11 +89,17 @@ class _FetchDataHelper:
         price_divs = self.elements_helper.get_elements_by_locator(by_type, price_css_locator)
         return title_divs, price_divs
     
+    @log_and_handle_errors('storing page snapshot')
+    def store_page_snapshot(self, snapshot_folder_path: str, metadata: dict[str, Any]) -> str:
+        # the store prunes itself from here at most once an hour, so the snapshot folder stays within the retention policy without a separate schedule
+        return SnapshotStore(snapshot_folder_path, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_TOTAL_BYTES).put(self.driver.page_source, metadata)
+    
     @log_and_handle_errors('formatting product elements')
-    def format_product_elements(self, title_divs: list[WebElement], price_divs: list[WebElement]) -> dict[str, float]:
+    def format_product_elements(self, title_divs: list[WebElement], price_divs: list[WebElement], currency_rates: tuple[float, float]) -> dict[str, float]:
         titles: list[str] = [title.strip() for title in format_webelements_to_divs(title_divs)]
         unformatted_prices: list[str] = format_webelements_to_divs(price_divs)
-        prices = [convert_currency(format_currency(price), 'INR', 'USD') for price in unformatted_prices]
+        inr_rate, usd_rate = currency_rates
+        prices = [convert_currency_with_rates(format_currency(price), inr_rate, usd_rate) for price in unformatted_prices]
         products = {title: price for title, price in zip(titles, prices)}
         return products
 
@@ -75,6 +119,8 @@ class _FetchDataHelper:
         df.to_csv(file_path, index=False)
         
     def cleanup(self) -> None:
+        if self.driver is None:
+            return
         logging.info(f"Closing driver.")
         self.driver.quit()
         
@@ -82,47 +128,118 @@ class _DatabaseHelper:
     def __init__(self, dbname, user, password, host) -> None:
         self.conn = self._setup_conn(dbname, user, password, host)
         self.cur = self.conn.cursor()
+        self.schema_manager = SchemaManager(self.cur, self.conn)
+        self.analytics = PriceAnalytics(self.cur, self.conn)
     
     @log_and_handle_errors('setting up database connection')
     def _setup_conn(self, dbname, user, password, host) -> None:
         conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host)
         return conn
     
-    @log_and_handle_errors('setting up table')
     def setup_table(self, product_type: str) -> None:
-        self.cur.execute(f"SELECT EXISTS (SELECT FROM pg_tables WHERE schemaname = 'public' AND tablename = %s);", (product_type,))
-        exists = self.cur.fetchone()[0]
-        if not exists:
-            self.cur.execute(f"""
-                CREATE TABLE {product_type} (
-                    id SERIAL PRIMARY KEY,
-                    website_id integer NOT NULL,
-                    product_name character varying NOT NULL,
-                    price_usd numeric NOT NULL,
-                    datetime timestamp with time zone NOT NULL,
-                    CONSTRAINT fk_website FOREIGN KEY (website_id) REFERENCES website(id)
-                );
-            """)
-            self.conn.commit()
+        self.schema_manager.ensure_table(product_type)
+    
+    def setup_latest_table(self, product_type: str) -> None:
+        self.schema_manager.ensure_latest_table(product_type)
+    
+    def setup_rollup_tables(self, product_type: str) -> None:
+        self.schema_manager.ensure_rollup_tables(product_type)
+    
+    @log_and_handle_errors('reading rows')
+    def read_rows(self, csv_file_path: str) -> list[tuple[int, str, str, str]]:
+        csv_rows = _read_csv_rows(csv_file_path)
+        website_ids = {website_name: get_or_create_id(self.cur, self.conn, 'website', 'website_name', website_name) for website_name in {row['website_name'] for row in csv_rows}}
+        return _to_price_rows(csv_rows, website_ids)
     
     @log_and_handle_errors('inserting data')
-    def insert_data(self, product_type: str, csv_file_path: str) -> None:
-        reader = csv.DictReader(open(csv_file_path))
-        for row in reader:
-            website_id = get_or_create_id(self.cur, self.conn, 'website', 'website_name', row['website_name'])
-            self.cur.execute(
-                f"INSERT INTO {product_type} (website_id, product_name, price_usd, datetime) VALUES (%s, %s, %s, %s)",
-                (website_id, row['product_name'], row['price_usd'], row['datetime'])
-            )
-            self.conn.commit()
+    def insert_data(self, product_type: str, rows: list[tuple[int, str, str, str]]) -> None:
+        if rows:
+            execute_values(self.cur, _insert_sql(product_type), rows, template=PRICE_ROW_TEMPLATE, page_size=len(rows))
+    
+    @log_and_handle_errors('upserting changed data')
+    def upsert_changed_data(self, product_type: str, rows: list[tuple[int, str, str, str]]) -> None:
+        """Upserts the batch into the latest price table and appends history rows only for products whose price changed.
+
+        The whole batch is a single statement, so a retried attempt sees the prices it already wrote and adds no duplicates.
+        """
+        if rows:
+            execute_values(self.cur, _upsert_changed_sql(product_type), rows, template=PRICE_ROW_TEMPLATE, page_size=len(rows))
+    
+    def refresh_analytics(self, product_type: str, rows: list[tuple[int, str, str, str]]) -> None:
+        self.analytics.refresh_for_batch(product_type, rows)
+    
+    def commit(self) -> None:
+        self.conn.commit()
         
-    def cleanup(self, csv_file_path: str) -> None:
-        logging.info(f"Cleaning up database connection and removing csv file.")
+    def close(self) -> None:
+        # closing without a commit rolls back anything the failed attempt wrote
         self.cur.close()
         self.conn.close()
+        
+    def cleanup(self, csv_file_path: str) -> None:
+        logging.info(f"Cleaning up database connection and removing csv file.")
+        self.close()
         os.remove(csv_file_path)
         
+class _AsyncDatabaseHelper:
+    """Shared by every async submit on the worker's event loop. Concurrent submissions for the same product type are merged into one transaction, and the merged batches are spread over a pool of non-blocking connections.
+    """
+    def __init__(self, dbname, user, password, host) -> None:
+        self.connect_kwargs = {'dbname': dbname, 'user': user, 'password': password, 'host': host}
+        self.pool = AsyncConnectionPool(ASYNC_DB_POOL_SIZE, **self.connect_kwargs)
+        self.writer = AsyncBatchWriter(self.pool, ASYNC_DB_MAX_BATCH_ROWS, ASYNC_DB_FLUSH_DELAY_SECONDS)
+        self.website_ids: dict[str, int] = {}
+        self.website_lock = asyncio.Lock()
+        self.setup_lock = asyncio.Lock()
+        self._setup_conn: psycopg2.extensions.connection | None = None
+    
+    async def setup_tables(self, product_type: str, change_only: bool) -> None:
+        if is_ensured(product_type, latest_table=change_only, rollup_tables=True):
+            return
+        async with self.setup_lock:
+            # DDL is rare and blocking, so it runs on a thread with a regular connection
+            await asyncio.to_thread(self._setup_tables, product_type, change_only)
+    
+    @log_and_handle_errors('setting up tables')
+    def _setup_tables(self, product_type: str, change_only: bool) -> None:
+        if self._setup_conn is None or self._setup_conn.closed:
+            self._setup_conn = psycopg2.connect(**self.connect_kwargs)
+        try:
+            schema_manager = SchemaManager(self._setup_conn.cursor(), self._setup_conn)
+            schema_manager.ensure_table(product_type)
+            if change_only:
+                schema_manager.ensure_latest_table(product_type)
+            schema_manager.ensure_rollup_tables(product_type)
+        except Exception:
+            # a failed statement leaves the transaction aborted, which would fail every later attempt on the reused connection
+            self._setup_conn.close()
+            self._setup_conn = None
+            raise
+    
+    async def read_rows(self, csv_file_path: str) -> list[tuple[int, str, str, str]]:
+        csv_rows = await asyncio.to_thread(_read_csv_rows, csv_file_path)
+        website_names = {row['website_name'] for row in csv_rows}
+        if website_names - self.website_ids.keys():
+            # serialized, so that concurrent submits for a new website don't each insert it
+            async with self.website_lock:
+                for website_name in website_names - self.website_ids.keys():
+                    async with self.pool.connection() as conn:
+                        self.website_ids[website_name] = await async_sql_helper.get_or_create_id(conn, 'website', 'website_name', website_name)
+        return _to_price_rows(csv_rows, self.website_ids)
+    
+    async def submit_rows(self, product_type: str, change_only: bool, rows: list[tuple[int, str, str, str]]) -> None:
+        async def flush(conn, merged_rows: list[tuple[int, str, str, str]]) -> None:
+            sql = _upsert_changed_sql(product_type) if change_only else _insert_sql(product_type)
+            # one transaction for the history write and the rollup refresh, so a failed refresh leaves nothing for the retry to duplicate
+            async with async_sql_helper.transaction(conn):
+                await async_sql_helper.execute_values(conn, sql, merged_rows, PRICE_ROW_TEMPLATE)
+                await refresh_for_batch_async(conn, product_type, merged_rows)
+        await self.writer.submit((product_type, change_only), rows, flush)
+        
 class FlipkartActivities:
+    def __init__(self) -> None:
+        self._async_database_helper: _AsyncDatabaseHelper | None = None
+    
     @activity.defn
     def fetch_data_from_flipkart(self, search_instructions: dict[str, Any]) -> None:
         product_type, search_keyword = search_instructions['type'], search_instructions['search_keyword']
@@ -137,7 +254,23 @@ class FlipkartActivities:
             title_class_name = attribute_class_names['title']
             price_class_name = attribute_class_names['price']
             product_title_divs, product_price_divs = activities_helper.fetch_product_elements('class_name', title_class_name, price_class_name)
-            products = activities_helper.format_product_elements(product_title_divs, product_price_divs)
+            # looked up once so that the snapshot records the exact rates the scraped prices were converted with
+            currency_rates = get_currency_rates('INR', 'USD')
+            if search_instructions.get('snapshot_folder_path'):
+                try:
+                    activities_helper.store_page_snapshot(search_instructions['snapshot_folder_path'], {
+                        'url': FLIPKART_URL,
+                        'type': product_type,
+                        'search_keyword': search_keyword,
+                        'title_class_name': title_class_name,
+                        'price_class_name': price_class_name,
+                        'filtering_regex': product_filtering_regex,
+                        'regex_case_insensitive': regex_case_insensitive,
+                        'currency_rates': {'INR': currency_rates[0], 'USD': currency_rates[1]},
+                    })
+                except ValueError:
+                    pass # a failed snapshot is already logged and should not fail the scrape
+            products = activities_helper.format_product_elements(product_title_divs, product_price_divs, currency_rates)
             filtered_products = activities_helper.filter_products(products, product_filtering_regex, regex_case_insensitive)
             
             if not os.path.exists(data_folder_path):
@@ -155,12 +288,47 @@ class FlipkartActivities:
         load_dotenv()
         data_folder_path, search_keyword, product_type = search_instructions['data_folder_path'], search_instructions['search_keyword'], search_instructions['type']
         csv_file_path = f"{data_folder_path}/{search_keyword}.csv"
+        database_helper = None
         try:
             database_helper = _DatabaseHelper(os.getenv('DB_NAME'), os.getenv('DB_USER'), os.getenv('DB_PASSWORD'), os.getenv('DB_HOST'))
+            change_only = search_instructions.get('change_only', False)
             database_helper.setup_table(product_type)
-            database_helper.insert_data(product_type, csv_file_path)
+            if change_only:
+                database_helper.setup_latest_table(product_type)
+            database_helper.setup_rollup_tables(product_type)
+            rows = database_helper.read_rows(csv_file_path)
+            if change_only:
+                database_helper.upsert_changed_data(product_type, rows)
+            else:
+                database_helper.insert_data(product_type, rows)
+            database_helper.refresh_analytics(product_type, rows)
+            # one commit for the history write and the rollup refresh, so a failed refresh leaves nothing for the retry to duplicate
+            database_helper.commit()
             database_helper.cleanup(csv_file_path)
         except Exception as e:
-            logging.error(f"Error fetching data from flipkart: {e}")
-            database_helper.cleanup()
-            raise ValueError(f"Error submitting data from flipkart into database: {e}")
\ No newline at end of file
+            logging.error(f"Error submitting data from flipkart into database: {e}")
+            if database_helper is not None:
+                database_helper.close() # keep the csv file so that the retry can submit it again
+            raise ValueError(f"Error submitting data from flipkart into database: {e}")
+    
+    @activity.defn
+    async def submit_data_to_database_async(self, search_instructions: dict[str, Any]) -> None:
+        data_folder_path, search_keyword, product_type = search_instructions['data_folder_path'], search_instructions['search_keyword'], search_instructions['type']
+        change_only = search_instructions.get('change_only', False)
+        csv_file_path = f"{data_folder_path}/{search_keyword}.csv"
+        try:
+            database_helper = self._get_async_database_helper()
+            await database_helper.setup_tables(product_type, change_only)
+            rows = await database_helper.read_rows(csv_file_path)
+            await database_helper.submit_rows(product_type, change_only, rows)
+            logging.info(f"Submitted {len(rows)} rows for {search_keyword}. Removing csv file.")
+            await asyncio.to_thread(os.remove, csv_file_path)
+        except Exception as e:
+            logging.error(f"Error submitting data from flipkart into database: {e}")
+            raise ValueError(f"Error submitting data from flipkart into database: {e}")
+    
+    def _get_async_database_helper(self) -> _AsyncDatabaseHelper:
+        if self._async_database_helper is None:
+            load_dotenv()
+            self._async_database_helper = _AsyncDatabaseHelper(os.getenv('DB_NAME'), os.getenv('DB_USER'), os.getenv('DB_PASSWORD'), os.getenv('DB_HOST'))
+        return self._async_database_helper
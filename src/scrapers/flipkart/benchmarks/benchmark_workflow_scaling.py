@@ -0,0 +1,212 @@
+"""
+Load tests FlipkartWorkflow against a local Temporal test server, with stub activities in place of the browser and the database.
+
+Run from the src directory, e.g.:
+    python -m scrapers.flipkart.benchmarks.benchmark_workflow_scaling --workflow-counts 10 100 1000 --worker-concurrency 10 100
+Stub latencies default to rough typical values, and should be overridden with ones measured in the target environment. Each run hosts its workers in a
+fresh child process, so the reported CPU and peak memory are the worker's own for that run, excluding the client and the test server.
+"""
+
+import os
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+import resource
+import statistics
+import multiprocessing
+import concurrent.futures
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any
+import pandas as pd
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from ..workflow import FlipkartWorkflow
+from ..config import DATABASE_TASK_QUEUE_SUFFIX, DATABASE_MAX_CONCURRENT_ACTIVITIES
+
+# seconds, rough per call latencies of fetch_data_from_flipkart with headless chrome and of a submit against a local postgres. Pass measured values from your own environment to size a real fleet.
+DEFAULT_FETCH_LATENCY_SECONDS = 6.0
+DEFAULT_SUBMIT_LATENCY_SECONDS = 0.08
+DEFAULT_LATENCY_JITTER = 0.2 # relative standard deviation of the emulated latencies
+
+class _StubActivities:
+    """Activities registered under the real activity names, which sleep for the emulated latency and record their schedule-to-start latency.
+    """
+    def __init__(self, fetch_latency_seconds: float, submit_latency_seconds: float, jitter: float):
+        self.fetch_latency_seconds = fetch_latency_seconds
+        self.submit_latency_seconds = submit_latency_seconds
+        self.jitter = jitter
+        self.schedule_to_start_seconds: list[float] = []
+
+    def _latency(self, mean_seconds: float) -> float:
+        return max(random.gauss(mean_seconds, mean_seconds * self.jitter), 0)
+
+    def _record_schedule_to_start(self) -> None:
+        scheduled_time = activity.info().current_attempt_scheduled_time
+        self.schedule_to_start_seconds.append((datetime.now(timezone.utc) - scheduled_time).total_seconds())
+
+    @activity.defn(name='fetch_data_from_flipkart')
+    def fetch_data_from_flipkart(self, search_instructions: dict[str, Any]) -> None:
+        # a blocking sleep, since the real activity holds an activity_executor thread while the browser works
+        self._record_schedule_to_start()
+        time.sleep(self._latency(self.fetch_latency_seconds))
+
+    @activity.defn(name='submit_data_to_database')
+    def submit_data_to_database(self, search_instructions: dict[str, Any]) -> None:
+        self._record_schedule_to_start()
+        time.sleep(self._latency(self.submit_latency_seconds))
+
+    @activity.defn(name='submit_data_to_database_async')
+    async def submit_data_to_database_async(self, search_instructions: dict[str, Any]) -> None:
+        self._record_schedule_to_start()
+        await asyncio.sleep(self._latency(self.submit_latency_seconds))
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+def _run_workers(target_host: str, namespace: str, task_queue: str, worker_concurrency: int, stubs: _StubActivities, ready, stop, results) -> None:
+    asyncio.run(_serve_workers(target_host, namespace, task_queue, worker_concurrency, stubs, ready, stop, results))
+
+async def _serve_workers(target_host: str, namespace: str, task_queue: str, worker_concurrency: int, stubs: _StubActivities, ready, stop, results) -> None:
+    client = await Client.connect(target_host, namespace=namespace)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=worker_concurrency) as activity_executor:
+        worker = Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[FlipkartWorkflow],
+            activities=[stubs.fetch_data_from_flipkart, stubs.submit_data_to_database],
+            activity_executor=activity_executor,
+            max_concurrent_activities=worker_concurrency,
+        )
+        database_worker = Worker(
+            client,
+            task_queue=task_queue + DATABASE_TASK_QUEUE_SUFFIX,
+            activities=[stubs.submit_data_to_database_async],
+            max_concurrent_activities=DATABASE_MAX_CONCURRENT_ACTIVITIES,
+        )
+        async with worker, database_worker:
+            usage_before = resource.getrusage(resource.RUSAGE_SELF)
+            ready.set()
+            await asyncio.to_thread(stop.wait)
+            usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        'cpu_seconds': (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime),
+        'peak_rss_mb': usage_after.ru_maxrss / 1024, # ru_maxrss is in kilobytes on linux, and covers only this run since the process is fresh
+        'schedule_to_start_seconds': stubs.schedule_to_start_seconds,
+    })
+
+async def benchmark_run(env: WorkflowEnvironment, workflow_count: int, worker_concurrency: int, stubs: _StubActivities) -> dict[str, Any]:
+    """Runs workflow_count workflows to completion on fresh workers and task queues, laid out like the real worker. The workers run in a child process, so that CPU and memory are measured for the worker alone.
+
+    Args:
+        env (WorkflowEnvironment): The test environment to run against.
+        workflow_count (int): The number of concurrent workflows to start.
+        worker_concurrency (int): The fetch worker's maximum concurrent activities, and the size of its activity_executor. The database worker keeps DATABASE_MAX_CONCURRENT_ACTIVITIES.
+        stubs (_StubActivities): The stub activities to register, copied into the worker process.
+
+    Returns:
+        dict[str, Any]: The measurements of the run.
+    """
+    task_queue = f"flipkart-benchmark-{uuid.uuid4()}"
+    # spawn rather than fork, since this process already runs the client's threads and event loop
+    context = multiprocessing.get_context('spawn')
+    ready, stop, results = context.Event(), context.Event(), context.Queue()
+    worker_process = context.Process(
+        target=_run_workers,
+        args=(env.client.service_client.config.target_host, env.client.namespace, task_queue, worker_concurrency, stubs, ready, stop, results),
+    )
+    worker_process.start()
+    try:
+        while not await asyncio.to_thread(ready.wait, 0.5):
+            if not worker_process.is_alive():
+                raise RuntimeError(f"Worker process exited with code {worker_process.exitcode} before it was ready.")
+        start_time = perf_counter()
+        handles = await asyncio.gather(*(
+            env.client.start_workflow(FlipkartWorkflow.scrape_flipkart, id=f"{task_queue}-{i}", task_queue=task_queue)
+            for i in range(workflow_count)
+        ))
+        await asyncio.gather(*(handle.result() for handle in handles))
+        elapsed_time = perf_counter() - start_time
+        stop.set()
+        measurements = await asyncio.to_thread(results.get, timeout=60)
+    finally:
+        stop.set()
+        await asyncio.to_thread(worker_process.join, 60)
+        if worker_process.is_alive():
+            worker_process.terminate()
+    latencies = measurements['schedule_to_start_seconds']
+    return {
+        'workflows': workflow_count,
+        'worker_concurrency': worker_concurrency,
+        'seconds': elapsed_time,
+        'workflows_per_second': workflow_count / elapsed_time,
+        'activities': len(latencies),
+        'schedule_to_start_p50_seconds': _percentile(latencies, 50),
+        'schedule_to_start_p95_seconds': _percentile(latencies, 95),
+        'schedule_to_start_mean_seconds': statistics.fmean(latencies) if latencies else float('nan'),
+        'worker_cpu_percent': measurements['cpu_seconds'] / elapsed_time * 100,
+        'worker_peak_rss_mb': measurements['peak_rss_mb'],
+    }
+
+async def benchmark_workflow_scaling(workflow_counts: list[int], worker_concurrencies: list[int], stubs: _StubActivities, time_skipping: bool = False, dev_server_path: str | None = None) -> list[dict[str, Any]]:
+    """Sweeps workflow count and worker concurrency against a single test environment.
+
+    Args:
+        workflow_counts (list[int]): The numbers of concurrent workflows to run.
+        worker_concurrencies (list[int]): The worker concurrency settings to run each workflow count with.
+        stubs (_StubActivities): The stub activities to register.
+        time_skipping (bool, optional): Use the time-skipping test server instead of the local dev server. Defaults to False.
+        dev_server_path (str | None, optional): A path to an existing dev server binary, instead of downloading one. Defaults to None.
+
+    Returns:
+        list[dict[str, Any]]: The measurements of every run.
+    """
+    if time_skipping:
+        env = await WorkflowEnvironment.start_time_skipping()
+    else:
+        env = await WorkflowEnvironment.start_local(dev_server_existing_path=dev_server_path)
+    results = []
+    async with env:
+        for workflow_count in workflow_counts:
+            for worker_concurrency in worker_concurrencies:
+                logging.info(f"Running {workflow_count} workflows with worker concurrency {worker_concurrency}...")
+                results.append(await benchmark_run(env, workflow_count, worker_concurrency, stubs))
+    return results
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Measure FlipkartWorkflow throughput and scheduling latency with stub activities.')
+    parser.add_argument('--workflow-counts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--worker-concurrency', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--fetch-latency', type=float, default=DEFAULT_FETCH_LATENCY_SECONDS)
+    parser.add_argument('--submit-latency', type=float, default=DEFAULT_SUBMIT_LATENCY_SECONDS)
+    parser.add_argument('--jitter', type=float, default=DEFAULT_LATENCY_JITTER)
+    parser.add_argument('--time-skipping', action='store_true', help='Use the time-skipping test server instead of the local dev server.')
+    parser.add_argument('--dev-server-path', help='Path to an existing Temporal dev server binary.')
+    args = parser.parse_args()
+
+    stubs = _StubActivities(args.fetch_latency, args.submit_latency, args.jitter)
+    results = asyncio.run(benchmark_workflow_scaling(args.workflow_counts, args.worker_concurrency, stubs, args.time_skipping, args.dev_server_path))
+    df = pd.DataFrame(results).round(3)
+    print(df.to_string(index=False))
+
+    folder_path = 'scrapers/flipkart/benchmarks/data' # assumes that the script is run from the src directory
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    file_path = f'{folder_path}/workflow_scaling_benchmark_results.csv'
+    if os.path.exists(file_path):
+        df.to_csv(file_path, mode='a', index=False, header=False)
+    else:
+        df.to_csv(file_path, index=False)
+
+if __name__ == '__main__':
+    main()
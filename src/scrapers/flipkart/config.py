@@ -1,8 +1,16 @@
 TASK_QUEUE_NAME = "flipkart"
+DATABASE_TASK_QUEUE_SUFFIX = "-database" # database activities run on their own task queue, named after the workflow's, so they never wait behind browser fetches
 WORKFLOW_ID = "flipkart-workflow"
 FLIPKART_URL = "https://www.flipkart.com/"
 PRODUCT_TITLE_DIV_XPATH_LOCATOR = '/html/body/div[1]/div[1]/div[3]/div[1]/div[2]/div[2]/div[1]/div[1]/div[1]/a[1]/div[2]/div[1]/div[1]'
 PRODUCT_PRICE_DIV_XPATH_LOCATOR = '/html/body/div[1]/div[1]/div[3]/div[1]/div[2]/div[2]/div[1]/div[1]/div[1]/a[1]/div[2]/div[2]/div[1]/div[1]/div[1]'
+FETCH_MAX_CONCURRENT_ACTIVITIES = 100 # also the size of the activity_executor, since every fetch holds a thread
+DATABASE_MAX_CONCURRENT_ACTIVITIES = 500 # async submits only hold a slot on the event loop while they wait on the connection pool
+ASYNC_DB_POOL_SIZE = 10
+ASYNC_DB_MAX_BATCH_ROWS = 5000
+ASYNC_DB_FLUSH_DELAY_SECONDS = 0.01
+SNAPSHOT_MAX_AGE_DAYS = 30
+SNAPSHOT_MAX_TOTAL_BYTES = 1024 ** 3 # compressed, the oldest snapshots are pruned first
 SEARCH_INSTRUCTIONS = [
     {
         'type': 'smartphone',
@@ -10,6 +18,8 @@ SEARCH_INSTRUCTIONS = [
         'filtering_regex': r".*GIONEE.*\([^)]*\)",
         'regex_case_insensitive': False,
         'data_folder_path': 'scrapers/flipkart/data',
+        'change_only': True, # only write history rows when a product's price changes
+        'snapshot_folder_path': 'scrapers/flipkart/snapshots', # remove to skip storing raw page snapshots
     },
     {
         'type': 'smartphone',
@@ -17,6 +27,8 @@ SEARCH_INSTRUCTIONS = [
         'filtering_regex': r".*SAMSUNG.*\([^)]*\)",
         'regex_case_insensitive': False,
         'data_folder_path': 'scrapers/flipkart/data',
+        'change_only': True, # only write history rows when a product's price changes
+        'snapshot_folder_path': 'scrapers/flipkart/snapshots', # remove to skip storing raw page snapshots
     },
     {
         'type': 'smartphone',
@@ -24,5 +36,7 @@ SEARCH_INSTRUCTIONS = [
         'filtering_regex': r".*Apple iPhone.*\([^)]*\)",
         'regex_case_insensitive': False,
         'data_folder_path': 'scrapers/flipkart/data',
+        'change_only': True, # only write history rows when a product's price changes
+        'snapshot_folder_path': 'scrapers/flipkart/snapshots', # remove to skip storing raw page snapshots
     }
 ]
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Re-runs product extraction over stored page snapshots, without a browser.
+
+Run from the src directory, e.g.:
+    python -m scrapers.flipkart.replay --keyword "apple iphone" --price-class-name Nx9bqj --output-file scrapers/flipkart/data/replay.csv
+    python -m scrapers.flipkart.replay --prune --max-age-days 30
+The fetch activity already prunes the store hourly with the config retention policy, so --prune is only needed to apply a different one right away.
+"""
+
+import os
+import argparse
+import logging
+import concurrent.futures
+from typing import Any
+import pandas as pd
+
+from utils.snapshot_store import SnapshotStore
+from utils.currency import get_currency_rates
+from utils.html_elements import find_elements_by_class_name
+from .activities import _FetchDataHelper
+from .config import SEARCH_INSTRUCTIONS, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_TOTAL_BYTES
+
+DEFAULT_SNAPSHOT_FOLDER_PATH = 'scrapers/flipkart/snapshots'
+
+def replay_snapshot(snapshot_folder_path: str, record: dict[str, Any], overrides: dict[str, Any], fallback_currency_rates: tuple[float, float] | None) -> pd.DataFrame:
+    """Extracts and filters the products of one stored snapshot. Prices are converted with the rates recorded at capture time, so replayed prices match the scraped ones and no network calls are made.
+
+    Args:
+        snapshot_folder_path (str): The path to the snapshot store.
+        record (dict[str, Any]): The index record of the snapshot.
+        overrides (dict[str, Any]): Locators or filtering settings to use instead of the ones stored with the snapshot.
+        fallback_currency_rates (tuple[float, float] | None): The INR and USD rates to use for snapshots stored without rates.
+
+    Returns:
+        pd.DataFrame: The products, in the same columns that the fetch activity writes to csv.
+    """
+    settings = {**record['metadata'], **{key: value for key, value in overrides.items() if value is not None}}
+    html = SnapshotStore(snapshot_folder_path, max_age_days=None).get(record['digest']).decode('utf-8')
+    title_divs = find_elements_by_class_name(html, settings['title_class_name'])
+    price_divs = find_elements_by_class_name(html, settings['price_class_name'])
+    stored_rates = settings.get('currency_rates')
+    currency_rates = (stored_rates['INR'], stored_rates['USD']) if stored_rates else fallback_currency_rates
+    helper = _FetchDataHelper(headless=True, use_driver=False)
+    products = helper.format_product_elements(title_divs, price_divs, currency_rates)
+    filtered_products = helper.filter_products(products, settings['filtering_regex'], settings['regex_case_insensitive'])
+    df = pd.DataFrame(filtered_products.items(), columns=['product_name', 'price_usd'])
+    df['website_name'] = 'flipkart'
+    df['product_type_name'] = settings['type']
+    df['datetime'] = pd.Timestamp(record['stored_at'])
+    df['snapshot_digest'] = record['digest']
+    return df[['website_name', 'product_type_name', 'product_name', 'price_usd', 'datetime', 'snapshot_digest']]
+
+def replay_snapshots(snapshot_folder_path: str, records: list[dict[str, Any]], overrides: dict[str, Any], max_workers: int | None = None) -> pd.DataFrame:
+    """Replays many snapshots in parallel across worker processes.
+
+    Args:
+        snapshot_folder_path (str): The path to the snapshot store.
+        records (list[dict[str, Any]]): The index records of the snapshots to replay.
+        overrides (dict[str, Any]): Locators or filtering settings to use instead of the ones stored with the snapshots.
+        max_workers (int | None, optional): The number of worker processes. Defaults to the number of cores.
+
+    Returns:
+        pd.DataFrame: The products of every snapshot that replayed successfully.
+    """
+    frames = []
+    fallback_currency_rates = None
+    if any(not record['metadata'].get('currency_rates') for record in records):
+        # fetched once here rather than in every worker, which would race on rewriting utils/currency_rates.json
+        logging.warning("Some snapshots have no recorded currency rates, so their prices are converted at today's rates.")
+        fallback_currency_rates = get_currency_rates('INR', 'USD')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(replay_snapshot, snapshot_folder_path, record, overrides, fallback_currency_rates): record for record in records}
+        for future in concurrent.futures.as_completed(futures):
+            record = futures[future]
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                logging.error(f"Error replaying snapshot {record['digest']}: {e}")
+    if not frames:
+        return pd.DataFrame(columns=['website_name', 'product_type_name', 'product_name', 'price_usd', 'datetime', 'snapshot_digest'])
+    return pd.concat(frames, ignore_index=True).sort_values(['datetime', 'product_name'], ignore_index=True)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Re-extract products from stored Flipkart page snapshots.')
+    parser.add_argument('--snapshot-folder-path', default=DEFAULT_SNAPSHOT_FOLDER_PATH)
+    parser.add_argument('--keyword', help='Only replay snapshots of this search keyword.')
+    parser.add_argument('--since', help='Only replay snapshots stored at or after this ISO date.')
+    parser.add_argument('--title-class-name', help='Override the stored title class name.')
+    parser.add_argument('--price-class-name', help='Override the stored price class name.')
+    parser.add_argument('--use-config-regex', action='store_true', help='Filter with the regex currently in config.SEARCH_INSTRUCTIONS instead of the stored one.')
+    parser.add_argument('--max-workers', type=int)
+    parser.add_argument('--output-file', default='scrapers/flipkart/data/replay.csv')
+    parser.add_argument('--prune', action='store_true', help='Apply the retention policy instead of replaying.')
+    parser.add_argument('--max-age-days', type=float, default=SNAPSHOT_MAX_AGE_DAYS)
+    parser.add_argument('--max-total-bytes', type=int, default=SNAPSHOT_MAX_TOTAL_BYTES)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.snapshot_folder_path, max_age_days=args.max_age_days, max_total_bytes=args.max_total_bytes, prune_interval_seconds=None)
+    if args.prune:
+        store.prune()
+        return
+
+    since = pd.Timestamp(args.since, tz='utc') if args.since else None
+    records = [
+        record for record in store.records()
+        if (args.keyword is None or record['metadata']['search_keyword'] == args.keyword)
+        and (since is None or pd.Timestamp(record['stored_at']) >= since)
+    ]
+    overrides = {'title_class_name': args.title_class_name, 'price_class_name': args.price_class_name}
+    if args.use_config_regex:
+        if args.keyword is None:
+            parser.error('--use-config-regex requires --keyword')
+        instruction = next((instruction for instruction in SEARCH_INSTRUCTIONS if instruction['search_keyword'] == args.keyword), None)
+        if instruction is None:
+            parser.error(f"--keyword {args.keyword!r} is not in config.SEARCH_INSTRUCTIONS")
+        overrides.update({'filtering_regex': instruction['filtering_regex'], 'regex_case_insensitive': instruction['regex_case_insensitive']})
+
+    logging.info(f"Replaying {len(records)} snapshots.")
+    df = replay_snapshots(args.snapshot_folder_path, records, overrides, args.max_workers)
+    output_folder_path = os.path.dirname(args.output_file)
+    if output_folder_path and not os.path.exists(output_folder_path):
+        os.makedirs(output_folder_path)
+    df.to_csv(args.output_file, index=False)
+    logging.info(f"Wrote {len(df)} products to {args.output_file}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import asyncio
+import pytest
+from temporalio.testing import WorkflowEnvironment
+from scrapers.flipkart.config import SEARCH_INSTRUCTIONS
+from scrapers.flipkart.benchmarks.benchmark_workflow_scaling import benchmark_workflow_scaling, _StubActivities
+
+async def _time_skipping_server_available() -> bool:
+    try:
+        env = await WorkflowEnvironment.start_time_skipping()
+    except RuntimeError:
+        return False
+    await env.shutdown()
+    return True
+
+class TestBenchmarkWorkflowScaling:
+    def test_small_sweep(self):
+        """Test if a small sweep on the time-skipping test server completes and reports worker measurements per run."""
+        if not asyncio.run(_time_skipping_server_available()):
+            pytest.skip('the Temporal test server could not be started, e.g. because it could not be downloaded')
+        stubs = _StubActivities(fetch_latency_seconds=0.01, submit_latency_seconds=0.01, jitter=0)
+        results = asyncio.run(benchmark_workflow_scaling([2], [1, 2], stubs, time_skipping=True))
+        assert [result['worker_concurrency'] for result in results] == [1, 2]
+        for result in results:
+            assert result['activities'] == 2 * 2 * len(SEARCH_INSTRUCTIONS) # a fetch and a submit per instruction and workflow
+            assert result['worker_peak_rss_mb'] > 0
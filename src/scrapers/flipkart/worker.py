@@ -5,23 +5,31 @@ from temporalio.client import Client
 from temporalio.worker import Worker
 from .workflow import FlipkartWorkflow
 from .activities import FlipkartActivities
-from .config import TASK_QUEUE_NAME
+from .config import TASK_QUEUE_NAME, DATABASE_TASK_QUEUE_SUFFIX, FETCH_MAX_CONCURRENT_ACTIVITIES, DATABASE_MAX_CONCURRENT_ACTIVITIES
 
 async def main():
     logging.basicConfig(level=logging.INFO)
     client = await Client.connect("localhost:7233", namespace="default")
 
     activities = FlipkartActivities()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=100) as activity_executor:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_MAX_CONCURRENT_ACTIVITIES) as activity_executor:
         worker = Worker(
             client,
             task_queue=TASK_QUEUE_NAME,
             workflows=[FlipkartWorkflow],
             activities=[activities.fetch_data_from_flipkart, activities.submit_data_to_database],
             activity_executor=activity_executor,
+            max_concurrent_activities=FETCH_MAX_CONCURRENT_ACTIVITIES,
+        )
+        # a separate worker, so that database submits have their own concurrency limit instead of sharing the fetch activities' slots
+        database_worker = Worker(
+            client,
+            task_queue=TASK_QUEUE_NAME + DATABASE_TASK_QUEUE_SUFFIX,
+            activities=[activities.submit_data_to_database_async],
+            max_concurrent_activities=DATABASE_MAX_CONCURRENT_ACTIVITIES,
         )
         logging.info(f"Starting the worker....{client.identity}")
-        await worker.run()
+        await asyncio.gather(worker.run(), database_worker.run())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -5,13 +5,20 @@ from temporalio.common import RetryPolicy
 # Import activity, passing it through the sandbox without reloading the module
 with workflow.unsafe.imports_passed_through():
     from .activities import FlipkartActivities
-    from .config import SEARCH_INSTRUCTIONS
+    from .config import SEARCH_INSTRUCTIONS, DATABASE_TASK_QUEUE_SUFFIX
     
 @workflow.defn
 class FlipkartWorkflow:
     @workflow.run
     async def scrape_flipkart(self) -> str:
         workflow.logger.info('scrape_flipkart workflow invoked.')
+        # workflows started before the async submit existed keep replaying the sync activity on the shared task queue
+        if workflow.patched('async-db-submit'):
+            submit_activity = FlipkartActivities.submit_data_to_database_async
+            submit_task_queue = workflow.info().task_queue + DATABASE_TASK_QUEUE_SUFFIX
+        else:
+            submit_activity = FlipkartActivities.submit_data_to_database
+            submit_task_queue = None
         for instruction in SEARCH_INSTRUCTIONS:
             try:
                 await workflow.execute_activity_method(
@@ -29,8 +36,9 @@ class FlipkartWorkflow:
                 raise
             try:
                 await workflow.execute_activity_method(
-                    FlipkartActivities.submit_data_to_database,
+                    submit_activity,
                     instruction,
+                    task_queue=submit_task_queue,
                     start_to_close_timeout=timedelta(seconds=45),
                     retry_policy=RetryPolicy(
                         backoff_coefficient=2.0,
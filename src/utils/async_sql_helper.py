@@ -0,0 +1,238 @@
+"""
+Non-blocking helpers for running psycopg2 queries on an asyncio event loop.
+
+Connections are opened in psycopg2's async mode and polled through the loop's reader/writer callbacks, so waiting on the database never occupies a thread.
+Async connections are always in autocommit mode, so every statement is its own transaction unless it runs inside `transaction`.
+"""
+
+import asyncio
+import logging
+import contextlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+import psycopg2
+import psycopg2.extensions as ext
+
+async def wait_for_poll(conn: ext.connection) -> None:
+    """Waits until an async connection has finished its current operation, without blocking the event loop.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == ext.POLL_OK:
+            return
+        if state == ext.POLL_READ:
+            add_callback, remove_callback = loop.add_reader, loop.remove_reader
+        elif state == ext.POLL_WRITE:
+            add_callback, remove_callback = loop.add_writer, loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state: {state}")
+        ready = loop.create_future()
+        add_callback(conn.fileno(), lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            remove_callback(conn.fileno())
+
+async def execute(conn: ext.connection, query: str, params: Any = None) -> ext.cursor:
+    """Executes a query on an async connection.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+        query (str): The query to execute.
+        params (Any, optional): The query parameters. Defaults to None.
+
+    Returns:
+        ext.cursor: The cursor, ready for fetching results.
+    """
+    cur = conn.cursor()
+    cur.execute(query, params)
+    await wait_for_poll(conn)
+    return cur
+
+async def execute_values(conn: ext.connection, query: str, rows: list[tuple], template: str) -> ext.cursor:
+    """The async counterpart of `psycopg2.extras.execute_values`, sending every row in a single statement.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+        query (str): The query, with a single %s where the VALUES list goes.
+        rows (list[tuple]): The rows to send.
+        template (str): The template of a single row, e.g. "(%s, %s)".
+
+    Returns:
+        ext.cursor: The cursor, ready for fetching results.
+    """
+    cur = conn.cursor()
+    values = b','.join(cur.mogrify(template, row) for row in rows)
+    encoding = ext.encodings[conn.encoding]
+    before, after = query.split('%s')
+    cur.execute(before.encode(encoding) + values + after.encode(encoding))
+    await wait_for_poll(conn)
+    return cur
+
+@contextlib.asynccontextmanager
+async def transaction(conn: ext.connection) -> AsyncIterator[ext.connection]:
+    """Runs the statements executed inside the context as one transaction, committing on success and rolling back on error.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+
+    Returns:
+        AsyncIterator[ext.connection]: The same connection.
+    """
+    await execute(conn, "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        if not conn.closed and not conn.isexecuting():
+            await execute(conn, "ROLLBACK")
+        raise
+    await execute(conn, "COMMIT")
+
+async def get_or_create_id(conn: ext.connection, table_name: str, column_name: str, value: str) -> int:
+    """The async counterpart of `utils.sql_helper.get_or_create_id`.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+        table_name (str): The name of the table to query.
+        column_name (str): The name of the column to query.
+        value (str): The value to query for.
+
+    Returns:
+        int: The id of the value in the table.
+    """
+    cur = await execute(conn, f"SELECT id FROM {table_name} WHERE {column_name} = %s", (value,))
+    result = cur.fetchone()
+    if result:
+        return result[0]
+    cur = await execute(conn, f"INSERT INTO {table_name} ({column_name}) VALUES (%s) RETURNING id", (value,))
+    return cur.fetchone()[0]
+
+class AsyncConnectionPool:
+    def __init__(self, max_size: int = 10, **connect_kwargs):
+        """Initializes the AsyncConnectionPool instance. Connections are opened lazily, up to max_size.
+
+        Args:
+            max_size (int, optional): The maximum number of open connections. Defaults to 10.
+            **connect_kwargs: Passed on to psycopg2.connect, e.g. dbname, user, password and host.
+        """
+        self.max_size = max_size
+        self.connect_kwargs = connect_kwargs
+        self._idle: list[ext.connection] = []
+        self._open_count = 0
+        self._available = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[ext.connection]:
+        """Borrows a connection for the duration of the context. Broken or still busy connections are closed instead of returned.
+
+        Returns:
+            AsyncIterator[ext.connection]: The borrowed connection.
+        """
+        conn = await self._acquire()
+        try:
+            yield conn
+        finally:
+            async with self._available:
+                if conn.closed or conn.isexecuting():
+                    # a cancelled waiter can leave a query running, so the connection can't be reused safely
+                    conn.close()
+                    self._open_count -= 1
+                else:
+                    self._idle.append(conn)
+                self._available.notify()
+
+    async def close(self) -> None:
+        async with self._available:
+            for conn in self._idle:
+                conn.close()
+            self._open_count -= len(self._idle)
+            self._idle.clear()
+
+    async def _acquire(self) -> ext.connection:
+        async with self._available:
+            while not self._idle and self._open_count >= self.max_size:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open_count += 1
+        try:
+            conn = psycopg2.connect(async_=1, **self.connect_kwargs)
+            await wait_for_poll(conn)
+        except Exception:
+            async with self._available:
+                self._open_count -= 1
+                self._available.notify()
+            raise
+        return conn
+
+class AsyncBatchWriter:
+    def __init__(self, pool: AsyncConnectionPool, max_batch_rows: int = 5000, flush_delay_seconds: float = 0.01):
+        """Initializes the AsyncBatchWriter instance.
+
+        Concurrent submissions that share a key are merged into one flush, and flushes for different keys, or for a key whose previous flush is still running, proceed in parallel on separate pooled connections.
+
+        Args:
+            pool (AsyncConnectionPool): The pool to borrow connections from.
+            max_batch_rows (int, optional): A pending batch is flushed right away once it holds this many rows. Defaults to 5000.
+            flush_delay_seconds (float, optional): How long the first submission of a batch waits for others to join it. Defaults to 0.01.
+        """
+        self.pool = pool
+        self.max_batch_rows = max_batch_rows
+        self.flush_delay_seconds = flush_delay_seconds
+        self._pending: dict[Hashable, tuple[list[tuple], list[asyncio.Future], Callable]] = {}
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, rows: list[tuple], flush: Callable[[ext.connection, list[tuple]], Awaitable[None]]) -> None:
+        """Queues rows to be written and waits until the flush that carries them has finished.
+
+        Args:
+            key (Hashable): Submissions with the same key are written by the same statement, so they must share a flush function.
+            rows (list[tuple]): The rows to write.
+            flush (Callable[[ext.connection, list[tuple]], Awaitable[None]]): Writes a merged batch of rows on a borrowed connection.
+
+        Raises:
+            Exception: Whatever the flush raised, for every submission in the failed batch.
+        """
+        if not rows:
+            return
+        future = asyncio.get_running_loop().create_future()
+        if key not in self._pending:
+            self._pending[key] = ([], [], flush)
+            self._start_flush(key, self._pending[key], self.flush_delay_seconds)
+        batch = self._pending[key]
+        pending_rows, futures, _ = batch
+        pending_rows.extend(rows)
+        futures.append(future)
+        if len(pending_rows) >= self.max_batch_rows:
+            # detach the full batch right away so that later submissions start a new one
+            del self._pending[key]
+            self._start_flush(key, batch, 0)
+        await future
+
+    def _start_flush(self, key: Hashable, batch: tuple[list[tuple], list[asyncio.Future], Callable], delay_seconds: float) -> None:
+        task = asyncio.create_task(self._flush(key, batch, delay_seconds))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, key: Hashable, batch: tuple[list[tuple], list[asyncio.Future], Callable], delay_seconds: float) -> None:
+        if delay_seconds:
+            await asyncio.sleep(delay_seconds)
+            if self._pending.get(key) is not batch:
+                return # the batch filled up and was already flushed
+            del self._pending[key]
+        rows, futures, flush = batch
+        try:
+            async with self.pool.connection() as conn:
+                await flush(conn, rows)
+        except Exception as e:
+            logging.error(f"Error flushing {len(rows)} rows for {key}: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
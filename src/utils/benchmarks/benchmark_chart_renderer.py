@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+from time import perf_counter
+import logging
+import numpy as np
+import pandas as pd
+from ..chart_renderer import BatchChartRenderer
+
+def generate_series(series_count, points_per_series, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('2024-01-01', periods=points_per_series, freq='h', tz='utc')
+    series = {}
+    for i in range(series_count):
+        prices = 100 + np.cumsum(rng.normal(0, 1, points_per_series))
+        series[f"Product {i} (Synthetic, 128 GB)"] = dict(zip(timestamps, prices.round(2)))
+    return series
+
+def benchmark_chart_renderer(series_counts, points_per_series, worker_counts, max_points):
+    results = []
+    for series_count in series_counts:
+        series = generate_series(series_count, points_per_series)
+        for max_workers in worker_counts:
+            logging.info(f"Rendering {series_count} charts with {max_workers} workers...")
+            folder_path = tempfile.mkdtemp(prefix='chart_benchmark_')
+            renderer = BatchChartRenderer(folder_path, 'Datetime', 'Price (USD)', max_points=max_points, max_workers=max_workers)
+            start_time = perf_counter()
+            file_paths = renderer.render(series)
+            elapsed_time = perf_counter() - start_time
+            shutil.rmtree(folder_path)
+            results.append({
+                'charts': len(file_paths),
+                'points_per_series': points_per_series,
+                'max_points': max_points,
+                'workers': max_workers,
+                'seconds': elapsed_time,
+                'charts_per_second': len(file_paths) / elapsed_time,
+            })
+    return results
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, max(cpu_count // 2, 1), cpu_count})
+    results = benchmark_chart_renderer([100, 1000], points_per_series=5000, worker_counts=worker_counts, max_points=500)
+    df = pd.DataFrame(results).round(3)
+    print(df.to_string(index=False))
+
+    folder_path = 'utils/benchmarks/data' # assumes that the script is run from the src directory
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    file_path = f'{folder_path}/chart_renderer_benchmark_results.csv'
+    if os.path.exists(file_path):
+        df.to_csv(file_path, mode='a', index=False, header=False)
+    else:
+        df.to_csv(file_path, index=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Renders per product price charts in bulk on top of `utils.plotter.Plotter`.
+
+Each worker process keeps one figure alive and redraws it for every chart it is given, long series are downsampled with LTTB (Largest-Triangle-Three-Buckets) before plotting, and every chart is written under a name derived from its series name.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from .plotter import Plotter
+
+_worker_figure: Figure | None = None
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Picks the indices of the points that best preserve the visual shape of a series, using Largest-Triangle-Three-Buckets.
+
+    Args:
+        x (np.ndarray): The numeric x values, sorted in ascending order.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The sorted indices of the kept points. Always includes the first and last point.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    bucket_size = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        average_x, average_y = x[end:next_end].mean(), y[end:next_end].mean()
+        selected_x, selected_y = x[selected], y[selected]
+        areas = np.abs((selected_x - average_x) * (y[start:end] - selected_y) - (selected_x - x[start:end]) * (average_y - selected_y))
+        selected = start + int(areas.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+def downsample(data_dict: dict, max_points: int) -> dict:
+    """Downsamples a series with LTTB, keeping it unchanged if it is already short enough.
+
+    Args:
+        data_dict (dict): A dictionary of x values (numbers or datetimes) to y values, sorted by x.
+        max_points (int): The number of points to keep.
+
+    Returns:
+        dict: The downsampled series.
+    """
+    if len(data_dict) <= max_points:
+        return data_dict
+    keys = list(data_dict.keys())
+    values = np.asarray(list(data_dict.values()), dtype=float)
+    try:
+        numeric_keys = np.asarray(keys, dtype=float)
+    except (TypeError, ValueError):
+        numeric_keys = pd.to_datetime(keys).asi8.astype(float)
+    return {keys[i]: data_dict[keys[i]] for i in lttb_indices(numeric_keys, values, max_points)}
+
+def chart_file_name(series_name: str) -> str:
+    """Builds a file system safe png name for a series. The hash suffix keeps names unique even when two series slugify the same way.
+
+    Args:
+        series_name (str): The name of the series, e.g. a product name.
+
+    Returns:
+        str: The file name.
+    """
+    slug = re.sub(r'[^a-z0-9]+', '-', series_name.lower()).strip('-')[:80]
+    digest = hashlib.sha1(series_name.encode('utf-8')).hexdigest()[:10]
+    return f"{slug}-{digest}.png"
+
+def _init_worker(figsize: tuple[float, float], dpi: int) -> None:
+    global _worker_figure
+    _worker_figure = Figure(figsize=figsize, dpi=dpi)
+    _worker_figure.add_subplot()
+
+def _render_chunk(chunk: list[tuple[str, dict]], x_label: str, y_label: str, folder_path: str, max_points: int) -> list[str]:
+    ax = _worker_figure.axes[0]
+    file_paths = []
+    for series_name, data_dict in chunk:
+        ax.clear()
+        Plotter(downsample(data_dict, max_points), series_name, x_label, y_label, folder_path).draw_line_graph(ax)
+        file_path = os.path.join(folder_path, chart_file_name(series_name))
+        _worker_figure.savefig(file_path)
+        file_paths.append(file_path)
+    return file_paths
+
+class BatchChartRenderer:
+    def __init__(self, folder_path: str, x_label: str, y_label: str, max_points: int = 500, max_workers: int | None = None, chunk_size: int = 50, figsize: tuple[float, float] = (10, 5), dpi: int = 100):
+        """Initializes the BatchChartRenderer instance.
+
+        Args:
+            folder_path (str): The path to the folder where the chart png files will be saved.
+            x_label (str): The label for the x-axis.
+            y_label (str): The label for the y-axis.
+            max_points (int, optional): Series longer than this are downsampled with LTTB before plotting. Defaults to 500.
+            max_workers (int | None, optional): The number of worker processes. Defaults to the number of cores.
+            chunk_size (int, optional): The number of charts sent to a worker process at a time. Defaults to 50.
+            figsize (tuple[float, float], optional): The figure size in inches. Defaults to (10, 5).
+            dpi (int, optional): The resolution of the png files. Defaults to 100.
+        """
+        self.folder_path = folder_path
+        self.x_label = x_label
+        self.y_label = y_label
+        self.max_points = max_points
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.figsize = figsize
+        self.dpi = dpi
+
+    def render(self, series: dict[str, dict]) -> list[str]:
+        """Renders one line chart per series across a pool of worker processes.
+
+        Args:
+            series (dict[str, dict]): A dictionary of series names (e.g. product names) to their data dictionaries.
+
+        Returns:
+            list[str]: The paths of the written png files, in the same order as the series.
+        """
+        if not os.path.exists(self.folder_path):
+            os.makedirs(self.folder_path)
+        items = list(series.items())
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        logging.info(f"Rendering {len(items)} charts in {len(chunks)} chunks.")
+        file_paths = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.figsize, self.dpi)) as executor:
+            futures = [executor.submit(_render_chunk, chunk, self.x_label, self.y_label, self.folder_path, self.max_points) for chunk in chunks]
+            for future in futures:
+                file_paths.extend(future.result())
+        return file_paths
@@ -33,14 +33,38 @@ def convert_currency(amount: float, from_currency: str, to_currency: str) -> flo
     Returns:
         float: The converted amount.
     """
+    from_currency_rate, to_currency_rate = get_currency_rates(from_currency, to_currency)
+    return convert_currency_with_rates(amount, from_currency_rate, to_currency_rate)
+
+def get_currency_rates(from_currency: str, to_currency: str) -> tuple[float, float]:
+    """Gets the current USD based rates of two currencies, updating the cached rates first if they are stale.
+
+    Args:
+        from_currency (str): The currency to convert from.
+        to_currency (str): The currency to convert to.
+
+    Returns:
+        tuple[float, float]: The rates of from_currency and to_currency.
+    """
     _update_currency_rates()
     file_path = 'utils/currency_rates.json'
     with open(file_path, 'r') as file:
         rates = json.load(file)
     if from_currency not in rates['rates'] or to_currency not in rates['rates']:
         raise Exception("Invalid currency code.")
-    from_currency_rate = rates['rates'][from_currency]
-    to_currency_rate = rates['rates'][to_currency]
+    return rates['rates'][from_currency], rates['rates'][to_currency]
+
+def convert_currency_with_rates(amount: float, from_currency_rate: float, to_currency_rate: float) -> float:
+    """Converts an amount with known rates, e.g. ones recorded when a page was scraped.
+
+    Args:
+        amount (float): The amount to convert.
+        from_currency_rate (float): The USD based rate of the currency to convert from.
+        to_currency_rate (float): The USD based rate of the currency to convert to.
+
+    Returns:
+        float: The converted amount.
+    """
     converted_currency = amount * to_currency_rate / from_currency_rate
     converted_currency = round(converted_currency, 2)
     return converted_currency
@@ -0,0 +1,74 @@
+"""
+Browserless element lookup over stored page source, for re-extracting data from snapshots.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# elements that never have a closing tag, so they are never pushed onto the open element stack
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+_SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+
+class HtmlElement:
+    """A minimal stand-in for a Selenium WebElement that exposes the element's text, so it can be passed to `utils.formatter.format_webelements_to_divs`.
+    """
+    def __init__(self, tag_name: str, class_names: list[str]):
+        self.tag_name = tag_name
+        self.class_names = class_names
+        self._text_parts: list[str] = []
+
+    @property
+    def text(self) -> str:
+        return re.sub(r'\s+', ' ', ''.join(self._text_parts)).strip()
+
+class _ClassNameParser(HTMLParser):
+    def __init__(self, required_classes: set[str]):
+        super().__init__(convert_charrefs=True)
+        self.required_classes = required_classes
+        self.elements: list[HtmlElement] = []
+        self._open_tags: list[tuple[str, HtmlElement | None]] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            return
+        class_names = (dict(attrs).get('class') or '').split()
+        element = None
+        if self.required_classes.issubset(class_names):
+            element = HtmlElement(tag, class_names)
+            self.elements.append(element)
+        self._open_tags.append((tag, element))
+        if tag in _SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        # tolerate unclosed elements by popping up to the closest matching open tag
+        for i in range(len(self._open_tags) - 1, -1, -1):
+            if self._open_tags[i][0] == tag:
+                for open_tag, _ in self._open_tags[i:]:
+                    if open_tag in _SKIPPED_TEXT_TAGS:
+                        self._skip_depth -= 1
+                del self._open_tags[i:]
+                return
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        for _, element in self._open_tags:
+            if element is not None:
+                element._text_parts.append(data)
+
+def find_elements_by_class_name(html: str, class_name: str) -> list[HtmlElement]:
+    """Finds every element that has all of the given classes, in document order. Mirrors Selenium's class_name locator, where a dotted name like 'Nx9bqj._4b5DiR' means both classes.
+
+    Args:
+        html (str): The page source.
+        class_name (str): The class name, or dot separated class names, to match.
+
+    Returns:
+        list[HtmlElement]: The matching elements.
+    """
+    parser = _ClassNameParser({name for name in class_name.split('.') if name})
+    parser.feed(html)
+    parser.close()
+    return parser.elements
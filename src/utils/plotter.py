@@ -1,6 +1,5 @@
-import matplotlib
-import matplotlib.pyplot as plt
-matplotlib.use('agg')
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 
 class Plotter:
     """A class that contains methods for plotting data in various formats.
@@ -22,38 +21,66 @@ class Plotter:
         self.folder_path = folder_path
         self.keys = list(self.data_dict.keys())
         self.values = list(self.data_dict.values())
-        
-    def line_graph(self) -> None:
+
+    def line_graph(self, file_name: str = 'line_graph.png') -> None:
         """Plots a line graph and saves it as a png file.
+
+        Args:
+            file_name (str, optional): The name of the png file. Defaults to 'line_graph.png'.
         """
-        plt.figure(figsize=(10, 5))
-        plt.plot(self.keys, self.values, marker='o', linestyle='-', color='b')
-        plt.xlabel(self.x_label)
-        plt.ylabel(self.y_label)
-        plt.title(self.title)
-        plt.grid(True)
-        plt.savefig(f"{self.folder_path}/line_graph.png")
-        plt.close()
-    
-    def bar_plot(self) -> None:
+        fig = Figure(figsize=(10, 5))
+        self.draw_line_graph(fig.add_subplot())
+        fig.savefig(f"{self.folder_path}/{file_name}")
+
+    def bar_plot(self, file_name: str = 'bar_plot.png') -> None:
         """Plots a bar graph and saves it as a png file.
+
+        Args:
+            file_name (str, optional): The name of the png file. Defaults to 'bar_plot.png'.
         """
-        plt.figure(figsize=(10, 5))
-        plt.bar(self.keys, self.values, color='skyblue')
-        plt.xlabel(self.x_label)
-        plt.ylabel(self.y_label)
-        plt.title(self.title)
-        plt.savefig(f"{self.folder_path}/bar_plot.png")
-        plt.close()
-
-    def pie_chart(self) -> None:
+        fig = Figure(figsize=(10, 5))
+        self.draw_bar_plot(fig.add_subplot())
+        fig.savefig(f"{self.folder_path}/{file_name}")
+
+    def pie_chart(self, file_name: str = 'pie_chart.png') -> None:
         """Plots a pie chart and saves it as a png file.
+
+        Args:
+            file_name (str, optional): The name of the png file. Defaults to 'pie_chart.png'.
+        """
+        fig = Figure(figsize=(8, 8))
+        self.draw_pie_chart(fig.add_subplot())
+        fig.savefig(f"{self.folder_path}/{file_name}")
+
+    def draw_line_graph(self, ax: Axes) -> None:
+        """Draws a line graph onto an existing axes, so that callers can reuse one figure across many plots.
+
+        Args:
+            ax (Axes): The axes to draw on.
+        """
+        ax.plot(self.keys, self.values, marker='o', linestyle='-', color='b')
+        ax.set_xlabel(self.x_label)
+        ax.set_ylabel(self.y_label)
+        ax.set_title(self.title)
+        ax.grid(True)
+
+    def draw_bar_plot(self, ax: Axes) -> None:
+        """Draws a bar graph onto an existing axes.
+
+        Args:
+            ax (Axes): The axes to draw on.
+        """
+        ax.bar(self.keys, self.values, color='skyblue')
+        ax.set_xlabel(self.x_label)
+        ax.set_ylabel(self.y_label)
+        ax.set_title(self.title)
+
+    def draw_pie_chart(self, ax: Axes) -> None:
+        """Draws a pie chart onto an existing axes.
+
+        Args:
+            ax (Axes): The axes to draw on.
         """
-        sizes = self.values
-        labels = self.keys
-        plt.figure(figsize=(8, 8))
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-        plt.axis('equal')  # ensure that pie is drawn as circle
-        plt.title(self.title)
-        plt.savefig(f"{self.folder_path}/pie_chart.png")
-        plt.close()
\ No newline at end of file
+        ax.pie(self.values, labels=self.keys, autopct='%1.1f%%', startangle=140)
+        ax.axis('equal')  # ensure that pie is drawn as circle
+        ax.set_title(self.title)
@@ -0,0 +1,234 @@
+"""
+SQL-side price analytics over the prices observed by each submitted batch.
+
+Aggregates live in rollup tables per product type, which are updated incrementally after each submitted batch:
+    <product_type>_daily_summary: one open/high/low/close row per website, product and UTC day.
+    <product_type>_product_stats: one min/max/avg row per website and product, rolled up from the daily summary.
+    <product_type>_rollup_batches: the (website_id, datetime) of every batch already counted, so a retried batch is not counted twice.
+The rollups are built from the scraped prices rather than the history table, so in change-only mode they still count every observation, including days on which the price did not move.
+"""
+
+import pandas as pd
+import psycopg2.extensions as ext
+from datetime import date
+from psycopg2.extras import execute_values
+
+from .debug_helper import log_and_handle_errors
+from . import async_sql_helper
+
+# (website_id, product_name, price_usd, datetime) of an observed price; price_usd and datetime may be strings
+ObservationRow = tuple[int, str, object, object]
+
+OBSERVATION_ROW_TEMPLATE = "(%s::integer, %s::varchar, %s::numeric, %s::timestamptz)"
+
+def daily_summary_refresh_sql(product_type: str) -> str:
+    """Returns the statement that merges a batch of observed prices into the daily summaries. Batches that were already counted are skipped. The single %s takes the observations as a VALUES list.
+
+    Args:
+        product_type (str): The name of the product type table.
+
+    Returns:
+        str: The SQL statement.
+    """
+    return f"""
+        WITH batch (website_id, product_name, price_usd, datetime) AS (VALUES %s),
+        new_batches AS (
+            INSERT INTO {product_type}_rollup_batches (website_id, datetime)
+            SELECT DISTINCT website_id, datetime FROM batch
+            ON CONFLICT DO NOTHING
+            RETURNING website_id, datetime
+        ),
+        daily AS (
+            SELECT b.website_id, b.product_name, (b.datetime AT TIME ZONE 'UTC')::date AS day,
+                (array_agg(b.price_usd ORDER BY b.datetime))[1] AS open_usd,
+                min(b.datetime) AS open_at,
+                max(b.price_usd) AS high_usd,
+                min(b.price_usd) AS low_usd,
+                (array_agg(b.price_usd ORDER BY b.datetime DESC))[1] AS close_usd,
+                max(b.datetime) AS close_at,
+                count(*) AS sample_count,
+                sum(b.price_usd) AS sum_usd
+            FROM batch b JOIN new_batches n ON n.website_id = b.website_id AND n.datetime = b.datetime
+            GROUP BY b.website_id, b.product_name, (b.datetime AT TIME ZONE 'UTC')::date
+        )
+        INSERT INTO {product_type}_daily_summary AS summary
+            (website_id, product_name, day, open_usd, open_at, high_usd, low_usd, close_usd, close_at, sample_count, sum_usd)
+        SELECT website_id, product_name, day, open_usd, open_at, high_usd, low_usd, close_usd, close_at, sample_count, sum_usd FROM daily
+        ON CONFLICT (website_id, product_name, day) DO UPDATE
+        SET open_usd = CASE WHEN EXCLUDED.open_at < summary.open_at THEN EXCLUDED.open_usd ELSE summary.open_usd END,
+            open_at = LEAST(summary.open_at, EXCLUDED.open_at),
+            high_usd = GREATEST(summary.high_usd, EXCLUDED.high_usd),
+            low_usd = LEAST(summary.low_usd, EXCLUDED.low_usd),
+            close_usd = CASE WHEN EXCLUDED.close_at >= summary.close_at THEN EXCLUDED.close_usd ELSE summary.close_usd END,
+            close_at = GREATEST(summary.close_at, EXCLUDED.close_at),
+            sample_count = summary.sample_count + EXCLUDED.sample_count,
+            sum_usd = summary.sum_usd + EXCLUDED.sum_usd
+    """
+
+def product_stats_refresh_sql(product_type: str) -> str:
+    """Returns the statement that recomputes the product stats touched by a batch from the daily summary. The single %s takes the observations as a VALUES list.
+
+    Args:
+        product_type (str): The name of the product type table.
+
+    Returns:
+        str: The SQL statement.
+    """
+    return f"""
+        WITH batch (website_id, product_name, price_usd, datetime) AS (VALUES %s),
+        affected AS (
+            SELECT DISTINCT website_id, product_name FROM batch
+        )
+        INSERT INTO {product_type}_product_stats AS stats
+            (website_id, product_name, min_usd, max_usd, avg_usd, sample_count, first_day, last_day, last_price_usd)
+        SELECT d.website_id, d.product_name,
+            min(d.low_usd),
+            max(d.high_usd),
+            round(sum(d.sum_usd) / sum(d.sample_count), 2),
+            sum(d.sample_count),
+            min(d.day),
+            max(d.day),
+            (array_agg(d.close_usd ORDER BY d.day DESC))[1]
+        FROM affected a
+        JOIN {product_type}_daily_summary d ON d.website_id = a.website_id AND d.product_name = a.product_name
+        GROUP BY d.website_id, d.product_name
+        ON CONFLICT (website_id, product_name) DO UPDATE
+        SET min_usd = EXCLUDED.min_usd, max_usd = EXCLUDED.max_usd, avg_usd = EXCLUDED.avg_usd,
+            sample_count = EXCLUDED.sample_count, first_day = EXCLUDED.first_day, last_day = EXCLUDED.last_day,
+            last_price_usd = EXCLUDED.last_price_usd
+    """
+
+def refresh_sql_statements(product_type: str) -> list[str]:
+    """Returns the statements that merge a batch of observed prices into the rollups, in the order they must run.
+
+    Args:
+        product_type (str): The name of the product type table.
+
+    Returns:
+        list[str]: The SQL statements, each with a single %s for the observations.
+    """
+    return [daily_summary_refresh_sql(product_type), product_stats_refresh_sql(product_type)]
+
+async def refresh_for_batch_async(conn: ext.connection, product_type: str, rows: list[ObservationRow]) -> None:
+    """The async counterpart of `PriceAnalytics.refresh_for_batch`. Run it inside `utils.async_sql_helper.transaction`, together with the history write.
+
+    Args:
+        conn (ext.connection): A psycopg2 connection opened with async_=1.
+        product_type (str): The name of the product type table. Its rollup tables must already exist, see `SchemaManager.ensure_rollup_tables`.
+        rows (list[ObservationRow]): The (website_id, product_name, price_usd, datetime) of every row in the batch.
+    """
+    if not rows:
+        return
+    for statement in refresh_sql_statements(product_type):
+        await async_sql_helper.execute_values(conn, statement, rows, OBSERVATION_ROW_TEMPLATE)
+
+class PriceAnalytics:
+    def __init__(self, cur: ext.cursor, conn: ext.connection):
+        """Initializes the PriceAnalytics instance.
+
+        Args:
+            cur (ext.cursor): The cursor object from psycopg2 to execute queries.
+            conn (ext.connection): The connection object from psycopg2 to commit changes.
+        """
+        self.cur = cur
+        self.conn = conn
+
+    @log_and_handle_errors('refreshing price rollups')
+    def refresh_for_batch(self, product_type: str, rows: list[ObservationRow]) -> None:
+        """Merges the prices observed by a submitted batch into the rollups. Does not commit, so that the caller can commit it together with the history write.
+
+        Args:
+            product_type (str): The name of the product type table. Its rollup tables must already exist, see `SchemaManager.ensure_rollup_tables`.
+            rows (list[ObservationRow]): The (website_id, product_name, price_usd, datetime) of every row in the batch.
+        """
+        if not rows:
+            return
+        for statement in refresh_sql_statements(product_type):
+            execute_values(self.cur, statement, rows, template=OBSERVATION_ROW_TEMPLATE, page_size=len(rows))
+
+    def product_stats(self, product_type: str, product_name: str | None = None) -> pd.DataFrame:
+        """Fetches the min/max/avg price stats of every product, or of a single product.
+
+        Args:
+            product_type (str): The name of the product type table.
+            product_name (str | None, optional): Only fetch the stats of this product. Defaults to None.
+
+        Returns:
+            pd.DataFrame: One row per website and product.
+        """
+        query = f"""
+            SELECT w.website_name, s.product_name, s.min_usd, s.max_usd, s.avg_usd, s.sample_count, s.first_day, s.last_day, s.last_price_usd
+            FROM {product_type}_product_stats s JOIN website w ON w.id = s.website_id
+        """
+        if product_name is None:
+            self.cur.execute(query + " ORDER BY s.product_name;")
+        else:
+            self.cur.execute(query + " WHERE s.product_name = %s;", (product_name,))
+        return self._fetch_dataframe()
+
+    def daily_summary(self, product_type: str, product_name: str, start_day: date | None = None, end_day: date | None = None) -> pd.DataFrame:
+        """Fetches the daily open/high/low/close prices of a product.
+
+        Args:
+            product_type (str): The name of the product type table.
+            product_name (str): The name of the product.
+            start_day (date | None, optional): The first day to include. Defaults to no lower bound.
+            end_day (date | None, optional): The last day to include. Defaults to no upper bound.
+
+        Returns:
+            pd.DataFrame: One row per website and day, ordered by day.
+        """
+        self.cur.execute(f"""
+            SELECT w.website_name, d.day, d.open_usd, d.high_usd, d.low_usd, d.close_usd, d.sample_count
+            FROM {product_type}_daily_summary d JOIN website w ON w.id = d.website_id
+            WHERE d.product_name = %s
+                AND (%s::date IS NULL OR d.day >= %s::date)
+                AND (%s::date IS NULL OR d.day <= %s::date)
+            ORDER BY d.day;
+        """, (product_name, start_day, start_day, end_day, end_day))
+        return self._fetch_dataframe()
+
+    def largest_price_drops(self, product_type: str, since_day: date, limit: int = 10) -> pd.DataFrame:
+        """Fetches the products whose latest price fell the most from their peak since a given day. The price carried into the window, i.e. the last close before since_day, counts towards the peak.
+
+        Args:
+            product_type (str): The name of the product type table.
+            since_day (date): The first day to look for a peak price in.
+            limit (int, optional): The number of products to return. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: One row per website and product, ordered by the largest drop first.
+        """
+        self.cur.execute(f"""
+            WITH windowed AS (
+                SELECT website_id, product_name,
+                    max(high_usd) AS peak_usd,
+                    (array_agg(close_usd ORDER BY day DESC))[1] AS latest_usd
+                FROM {product_type}_daily_summary
+                WHERE day >= %s
+                GROUP BY website_id, product_name
+            ),
+            carried AS (
+                SELECT DISTINCT ON (website_id, product_name) website_id, product_name, close_usd
+                FROM {product_type}_daily_summary
+                WHERE day < %s
+                ORDER BY website_id, product_name, day DESC
+            ),
+            drops AS (
+                SELECT w.website_id, w.product_name, GREATEST(w.peak_usd, c.close_usd) AS peak_usd, w.latest_usd
+                FROM windowed w
+                LEFT JOIN carried c ON c.website_id = w.website_id AND c.product_name = w.product_name
+            )
+            SELECT w.website_name, d.product_name, d.peak_usd, d.latest_usd,
+                d.peak_usd - d.latest_usd AS drop_usd,
+                round((d.peak_usd - d.latest_usd) / nullif(d.peak_usd, 0) * 100, 2) AS drop_percent
+            FROM drops d JOIN website w ON w.id = d.website_id
+            WHERE d.latest_usd < d.peak_usd
+            ORDER BY drop_usd DESC
+            LIMIT %s;
+        """, (since_day, since_day, limit))
+        return self._fetch_dataframe()
+
+    def _fetch_dataframe(self) -> pd.DataFrame:
+        columns = [column.name for column in self.cur.description]
+        return pd.DataFrame(self.cur.fetchall(), columns=columns)
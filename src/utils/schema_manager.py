@@ -0,0 +1,302 @@
+"""
+Creates and maintains the per product type price, latest price and rollup tables.
+
+Price history tables are range partitioned by month on `datetime`, with partitions created ahead of time so the hot path never waits on DDL.
+"""
+
+import sys
+import logging
+import threading
+from datetime import date, datetime, timezone
+import psycopg2.errors
+import psycopg2.extensions as ext
+
+from .debug_helper import log_and_handle_errors
+
+# product_type -> first day of the last month that already has a partition. Shared by every SchemaManager in the process.
+_ensured_tables: dict[str, date] = {}
+_ensured_latest_tables: set[str] = set()
+_ensured_rollup_tables: set[str] = set()
+_cache_lock = threading.Lock()
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def is_ensured(product_type: str, latest_table: bool = False, rollup_tables: bool = False, months_ahead: int = 3, now: datetime | None = None) -> bool:
+    """Checks the per-process cache, without touching the database, for whether the ensure_* calls of a product type would be no-ops. Lets callers that can't block, like the async submit, skip handing setup off to a thread.
+
+    Args:
+        product_type (str): The name of the product type table.
+        latest_table (bool, optional): Also require the latest price table. Defaults to False.
+        rollup_tables (bool, optional): Also require the rollup tables. Defaults to False.
+        months_ahead (int, optional): The months_ahead of the SchemaManager that ensures the table. Defaults to 3.
+        now (datetime | None, optional): The time to compute the partition horizon from. Defaults to the current UTC time.
+
+    Returns:
+        bool: Whether every requested table is already ensured.
+    """
+    horizon = _add_months(_month_start(now or datetime.now(timezone.utc)), months_ahead)
+    with _cache_lock:
+        # same check as SchemaManager.ensure_table and friends use to skip the catalog
+        return (_ensured_tables.get(product_type, date.min) >= horizon
+            and (not latest_table or product_type in _ensured_latest_tables)
+            and (not rollup_tables or product_type in _ensured_rollup_tables))
+
+class SchemaManager:
+    def __init__(self, cur: ext.cursor, conn: ext.connection, months_ahead: int = 3):
+        """Initializes the SchemaManager instance.
+
+        Args:
+            cur (ext.cursor): The cursor object from psycopg2 to execute queries.
+            conn (ext.connection): The connection object from psycopg2 to commit changes.
+            months_ahead (int, optional): How many months of partitions to keep created past the current month. Defaults to 3.
+        """
+        self.cur = cur
+        self.conn = conn
+        self.months_ahead = months_ahead
+
+    def ensure_table(self, product_type: str, now: datetime | None = None) -> None:
+        """Makes sure the partitioned history table, its indexes and enough future partitions exist. Only touches the catalog the first time per process, or when the partition horizon has to move forward.
+
+        Args:
+            product_type (str): The name of the product type table.
+            now (datetime | None, optional): The time to compute the partition horizon from. Defaults to the current UTC time.
+        """
+        current_month = _month_start(now or datetime.now(timezone.utc))
+        horizon = _add_months(current_month, self.months_ahead)
+        with _cache_lock:
+            if _ensured_tables.get(product_type, date.min) >= horizon:
+                return
+        self._setup_table(product_type, current_month, horizon)
+        with _cache_lock:
+            _ensured_tables[product_type] = horizon
+
+    def ensure_latest_table(self, product_type: str) -> None:
+        """Makes sure the latest price table used by change-only writes exists. Only touches the catalog the first time per process.
+
+        Args:
+            product_type (str): The name of the product type table.
+        """
+        with _cache_lock:
+            if product_type in _ensured_latest_tables:
+                return
+        self._setup_latest_table(product_type)
+        with _cache_lock:
+            _ensured_latest_tables.add(product_type)
+
+    def ensure_rollup_tables(self, product_type: str) -> None:
+        """Makes sure the daily summary and product stats tables used by `utils.price_analytics` exist. Only touches the catalog the first time per process.
+
+        Args:
+            product_type (str): The name of the product type table.
+        """
+        with _cache_lock:
+            if product_type in _ensured_rollup_tables:
+                return
+        self._setup_rollup_tables(product_type)
+        with _cache_lock:
+            _ensured_rollup_tables.add(product_type)
+
+    @log_and_handle_errors('setting up partitioned table')
+    def _setup_table(self, product_type: str, first_month: date, horizon: date) -> None:
+        self._lock_product_type(product_type)
+        kind = self._table_kind(product_type)
+        if kind == 'r':
+            logging.warning(f"Table {product_type} is not partitioned. Run `python -m utils.schema_manager migrate {product_type}` to migrate it.")
+            self._create_indexes(product_type)
+        else:
+            if kind is None:
+                self._create_partitioned_table(product_type)
+            self._create_partitions(product_type, first_month, horizon)
+            self._create_indexes(product_type)
+        self.conn.commit()
+
+    @log_and_handle_errors('setting up latest price table')
+    def _setup_latest_table(self, product_type: str) -> None:
+        self._lock_product_type(product_type)
+        self.cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_type}_latest (
+                website_id integer NOT NULL,
+                product_name character varying NOT NULL,
+                price_usd numeric NOT NULL,
+                datetime timestamp with time zone NOT NULL,
+                PRIMARY KEY (website_id, product_name),
+                CONSTRAINT fk_website FOREIGN KEY (website_id) REFERENCES website(id)
+            );
+        """)
+        self.conn.commit()
+
+    @log_and_handle_errors('setting up rollup tables')
+    def _setup_rollup_tables(self, product_type: str) -> None:
+        self._lock_product_type(product_type)
+        self.cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_type}_daily_summary (
+                website_id integer NOT NULL,
+                product_name character varying NOT NULL,
+                day date NOT NULL,
+                open_usd numeric NOT NULL,
+                open_at timestamp with time zone NOT NULL,
+                high_usd numeric NOT NULL,
+                low_usd numeric NOT NULL,
+                close_usd numeric NOT NULL,
+                close_at timestamp with time zone NOT NULL,
+                sample_count integer NOT NULL,
+                sum_usd numeric NOT NULL,
+                PRIMARY KEY (website_id, product_name, day)
+            );
+        """)
+        self.cur.execute(f"CREATE INDEX IF NOT EXISTS {product_type}_daily_summary_day_idx ON {product_type}_daily_summary (day);")
+        self.cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_type}_product_stats (
+                website_id integer NOT NULL,
+                product_name character varying NOT NULL,
+                min_usd numeric NOT NULL,
+                max_usd numeric NOT NULL,
+                avg_usd numeric NOT NULL,
+                sample_count integer NOT NULL,
+                first_day date NOT NULL,
+                last_day date NOT NULL,
+                last_price_usd numeric NOT NULL,
+                PRIMARY KEY (website_id, product_name)
+            );
+        """)
+        self.cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_type}_rollup_batches (
+                website_id integer NOT NULL,
+                datetime timestamp with time zone NOT NULL,
+                PRIMARY KEY (website_id, datetime)
+            );
+        """)
+        self.conn.commit()
+
+    @log_and_handle_errors('migrating unpartitioned table')
+    def migrate_unpartitioned_table(self, product_type: str, keep_legacy_table: bool = False) -> None:
+        """Copies an existing unpartitioned history table into a new partitioned one, in a single transaction.
+
+        Args:
+            product_type (str): The name of the product type table.
+            keep_legacy_table (bool, optional): Keep the old table as <product_type>_unpartitioned instead of dropping it. Defaults to False.
+        """
+        self._lock_product_type(product_type)
+        if self._table_kind(product_type) != 'r':
+            logging.info(f"Table {product_type} does not need migrating.")
+            return
+        legacy_table = f"{product_type}_unpartitioned"
+        self.cur.execute(f"ALTER TABLE {product_type} RENAME TO {legacy_table};")
+        for index_suffix in ('product_name_datetime_idx', 'website_id_idx', 'observation_key'):
+            self.cur.execute(f"ALTER INDEX IF EXISTS {product_type}_{index_suffix} RENAME TO {legacy_table}_{index_suffix};")
+        self.cur.execute(f"SELECT min(datetime) FROM {legacy_table};")
+        oldest: datetime | None = self.cur.fetchone()[0]
+        current_month = _month_start(datetime.now(timezone.utc))
+        first_month = _month_start(oldest.astimezone(timezone.utc)) if oldest else current_month
+        self._create_partitioned_table(product_type)
+        self._create_partitions(product_type, min(first_month, current_month), _add_months(current_month, self.months_ahead))
+        self._create_indexes(product_type)
+        self.cur.execute(f"""
+            INSERT INTO {product_type} (id, website_id, product_name, price_usd, datetime)
+            SELECT id, website_id, product_name, price_usd, datetime FROM {legacy_table}
+            ON CONFLICT DO NOTHING;
+        """)
+        self.cur.execute(f"SELECT setval(pg_get_serial_sequence('{product_type}', 'id'), coalesce(max(id), 0) + 1, false) FROM {product_type};")
+        if not keep_legacy_table:
+            self.cur.execute(f"DROP TABLE {legacy_table};")
+        self.conn.commit()
+        with _cache_lock:
+            _ensured_tables.pop(product_type, None)
+
+    def _lock_product_type(self, product_type: str) -> None:
+        # serializes setup of the same product type across workers until the transaction ends, since concurrent DDL on one table can fail even with IF NOT EXISTS
+        self.cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (product_type,))
+
+    def _table_kind(self, product_type: str) -> str | None:
+        # 'p' is a partitioned table, 'r' a plain one
+        self.cur.execute("""
+            SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relname = %s;
+        """, (product_type,))
+        result = self.cur.fetchone()
+        return result[0] if result else None
+
+    def _create_partitioned_table(self, product_type: str) -> None:
+        self.cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_type} (
+                id BIGSERIAL,
+                website_id integer NOT NULL,
+                product_name character varying NOT NULL,
+                price_usd numeric NOT NULL,
+                datetime timestamp with time zone NOT NULL,
+                PRIMARY KEY (id, datetime),
+                CONSTRAINT fk_website FOREIGN KEY (website_id) REFERENCES website(id)
+            ) PARTITION BY RANGE (datetime);
+        """)
+        self.cur.execute(f"CREATE TABLE IF NOT EXISTS {product_type}_default PARTITION OF {product_type} DEFAULT;")
+
+    def _create_partitions(self, product_type: str, first_month: date, horizon: date) -> None:
+        month = first_month
+        while month <= horizon:
+            next_month = _add_months(month, 1)
+            partition = f"{product_type}_y{month.year}m{month.month:02d}"
+            bounds = (f"{month.isoformat()} 00:00:00+00", f"{next_month.isoformat()} 00:00:00+00")
+            if self._default_partition_has_rows(product_type, bounds):
+                self._create_partition_from_default(product_type, partition, bounds)
+            else:
+                self.cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {product_type}
+                    FOR VALUES FROM (%s) TO (%s);
+                """, bounds)
+            month = next_month
+
+    def _default_partition_has_rows(self, product_type: str, bounds: tuple[str, str]) -> bool:
+        self.cur.execute(f"SELECT EXISTS (SELECT 1 FROM {product_type}_default WHERE datetime >= %s AND datetime < %s);", bounds)
+        result = self.cur.fetchone()
+        return bool(result and result[0])
+
+    def _create_partition_from_default(self, product_type: str, partition: str, bounds: tuple[str, str]) -> None:
+        # postgres refuses to create a partition whose range already has rows in the default partition, so those rows are moved into it while the default is detached
+        logging.info(f"Moving rows of {partition} out of {product_type}_default.")
+        self.cur.execute(f"ALTER TABLE {product_type} DETACH PARTITION {product_type}_default;")
+        self.cur.execute(f"CREATE TABLE {partition} PARTITION OF {product_type} FOR VALUES FROM (%s) TO (%s);", bounds)
+        self.cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {product_type}_default WHERE datetime >= %s AND datetime < %s
+                RETURNING id, website_id, product_name, price_usd, datetime
+            )
+            INSERT INTO {product_type} (id, website_id, product_name, price_usd, datetime)
+            SELECT id, website_id, product_name, price_usd, datetime FROM moved;
+        """, bounds)
+        self.cur.execute(f"ALTER TABLE {product_type} ATTACH PARTITION {product_type}_default DEFAULT;")
+
+    def _create_indexes(self, product_type: str) -> None:
+        self.cur.execute(f"CREATE INDEX IF NOT EXISTS {product_type}_product_name_datetime_idx ON {product_type} (product_name, datetime);")
+        self.cur.execute(f"CREATE INDEX IF NOT EXISTS {product_type}_website_id_idx ON {product_type} (website_id);")
+        # identifies a scraped price, so that a retried append-mode batch inserts nothing twice
+        self.cur.execute("SAVEPOINT observation_key;")
+        try:
+            self.cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {product_type}_observation_key ON {product_type} (website_id, product_name, datetime);")
+        except psycopg2.errors.UniqueViolation:
+            self.cur.execute("ROLLBACK TO SAVEPOINT observation_key;")
+            logging.warning(f"Table {product_type} already holds duplicate rows, so retried append-mode batches are not deduplicated. Remove the duplicates to enable it.")
+        self.cur.execute("RELEASE SAVEPOINT observation_key;")
+
+def main():
+    import os
+    import psycopg2
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3 or sys.argv[1] != 'migrate':
+        print("Usage: python -m utils.schema_manager migrate <product_type>")
+        sys.exit(1)
+    load_dotenv()
+    conn = psycopg2.connect(dbname=os.getenv('DB_NAME'), user=os.getenv('DB_USER'), password=os.getenv('DB_PASSWORD'), host=os.getenv('DB_HOST'))
+    try:
+        SchemaManager(conn.cursor(), conn).migrate_unpartitioned_table(sys.argv[2])
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
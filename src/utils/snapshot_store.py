@@ -0,0 +1,171 @@
+"""
+An append-only, content-addressed local store for compressed raw page snapshots.
+
+Layout under the store's root folder:
+    objects/<first 2 hex chars>/<sha256>.gz: the gzip compressed content, written once per distinct content.
+    index.jsonl: one JSON record per stored snapshot, holding its digest, size, store time and caller supplied metadata.
+    .last_prune: touched by every prune, so that writers can tell when the retention policy is due again.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import fcntl
+import tempfile
+import contextlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+class SnapshotStore:
+    def __init__(self, root_path: str, max_age_days: float | None = 30, max_total_bytes: int | None = None, prune_interval_seconds: float | None = 3600):
+        """Initializes the SnapshotStore instance.
+
+        Args:
+            root_path (str): The path to the folder that holds the store.
+            max_age_days (float | None, optional): Snapshots older than this are removed by prune. Defaults to 30.
+            max_total_bytes (int | None, optional): Prune removes the oldest snapshots until the compressed objects fit in this many bytes. Defaults to no limit.
+            prune_interval_seconds (float | None, optional): put also prunes when no process has pruned the store for this long. None leaves pruning to explicit prune calls. Defaults to 3600.
+        """
+        self.root_path = root_path
+        self.objects_path = os.path.join(root_path, 'objects')
+        self.index_path = os.path.join(root_path, 'index.jsonl')
+        self.lock_path = os.path.join(root_path, '.lock')
+        self.last_prune_path = os.path.join(root_path, '.last_prune')
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_bytes
+        self.prune_interval_seconds = prune_interval_seconds
+        os.makedirs(self.objects_path, exist_ok=True)
+
+    def put(self, content: str | bytes, metadata: dict[str, Any]) -> str:
+        """Stores a snapshot. Identical content is only written to disk once, but every call appends its own index record. Applies the retention policy afterwards when it is due.
+
+        Args:
+            content (str | bytes): The page source or captured JSON.
+            metadata (dict[str, Any]): JSON serializable details about the snapshot, e.g. the search keyword and locators used.
+
+        Returns:
+            str: The sha256 digest that addresses the content.
+        """
+        raw = content.encode('utf-8') if isinstance(content, str) else content
+        digest = hashlib.sha256(raw).hexdigest()
+        compressed = gzip.compress(raw)
+        object_path = self._object_path(digest)
+        record = {
+            'digest': digest,
+            'size_bytes': len(raw),
+            'stored_at': datetime.now(timezone.utc).isoformat(),
+            'metadata': metadata,
+        }
+        # the lock keeps prune, which usually runs in another process, from deleting an object between the existence check and the index append
+        with self._locked():
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                # write to a temporary file first so that readers never see a partially written object
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(object_path), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(compressed)
+                os.replace(temp_path, object_path)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        if self._prune_due():
+            self.prune()
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """Reads the decompressed content of a snapshot.
+
+        Args:
+            digest (str): The sha256 digest returned by put.
+
+        Returns:
+            bytes: The stored content.
+        """
+        with open(self._object_path(digest), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        """Iterates over the index records, oldest first.
+
+        Returns:
+            Iterator[dict[str, Any]]: The index records.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def prune(self) -> int:
+        """Applies the retention policy by dropping old index records and deleting objects that no record references anymore.
+
+        Returns:
+            int: The number of index records removed.
+        """
+        with self._locked():
+            records = list(self.records())
+            kept = records
+            if self.max_age_days is not None:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+                kept = [record for record in kept if datetime.fromisoformat(record['stored_at']) >= cutoff]
+            if self.max_total_bytes is not None:
+                kept = self._newest_within_size(kept)
+            if len(kept) != len(records):
+                self._rewrite_index(kept)
+            referenced = {record['digest'] for record in kept}
+            for digest in {record['digest'] for record in records} - referenced:
+                object_path = self._object_path(digest)
+                if os.path.exists(object_path):
+                    os.remove(object_path)
+            with open(self.last_prune_path, 'a'):
+                os.utime(self.last_prune_path)
+        removed = len(records) - len(kept)
+        logging.info(f"Pruned {removed} snapshot records from {self.root_path}.")
+        return removed
+
+    def _prune_due(self) -> bool:
+        if self.prune_interval_seconds is None:
+            return False
+        if not os.path.exists(self.last_prune_path):
+            return True
+        return time.time() - os.path.getmtime(self.last_prune_path) >= self.prune_interval_seconds
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        # flock locks belong to the open file, so this excludes other processes as well as other threads of this one
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _newest_within_size(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        kept_digests: set[str] = set()
+        total_bytes = 0
+        kept = []
+        for record in reversed(records):
+            digest = record['digest']
+            if digest not in kept_digests:
+                object_path = self._object_path(digest)
+                object_bytes = os.path.getsize(object_path) if os.path.exists(object_path) else 0
+                if total_bytes + object_bytes > self.max_total_bytes:
+                    break
+                kept_digests.add(digest)
+                total_bytes += object_bytes
+            kept.append(record)
+        kept.reverse()
+        return kept
+
+    def _rewrite_index(self, records: list[dict[str, Any]]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.root_path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        os.replace(temp_path, self.index_path)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_path, digest[:2], f"{digest}.gz")
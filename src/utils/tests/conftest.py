@@ -0,0 +1,22 @@
+import pytest
+
+@pytest.fixture(scope='session')
+def postgres_server(tmp_path_factory):
+    """Fixture to start a throwaway local postgres server for the session. Tests that use it are skipped when pgserver is not installed."""
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(str(tmp_path_factory.mktemp('pgdata')), cleanup_mode='stop')
+    yield server
+    server.cleanup()
+
+@pytest.fixture
+def postgres_conn(postgres_server):
+    """Fixture to connect to an empty public schema that holds only the website table, like the production database."""
+    import psycopg2
+    conn = psycopg2.connect(postgres_server.get_uri())
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+    cur.execute("CREATE TABLE website (id SERIAL PRIMARY KEY, website_name character varying NOT NULL);")
+    cur.execute("INSERT INTO website (website_name) VALUES ('flipkart');")
+    conn.commit()
+    yield conn
+    conn.close()
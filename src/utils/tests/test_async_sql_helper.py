@@ -0,0 +1,89 @@
+import asyncio
+import contextlib
+import pytest
+from ..async_sql_helper import AsyncBatchWriter, AsyncConnectionPool, execute, transaction
+
+class _FakePool:
+    """A stand-in for AsyncConnectionPool that hands out placeholder connections and tracks how many are borrowed at once."""
+    def __init__(self):
+        self.borrowed = 0
+        self.max_borrowed = 0
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        self.borrowed += 1
+        self.max_borrowed = max(self.max_borrowed, self.borrowed)
+        try:
+            yield object()
+        finally:
+            self.borrowed -= 1
+
+class TestAsyncBatchWriter:
+    def test_concurrent_submissions_are_merged(self):
+        """Test if submissions that arrive within the flush delay are written by a single flush."""
+        flushed = []
+        async def flush(conn, rows):
+            flushed.append(list(rows))
+
+        async def main():
+            writer = AsyncBatchWriter(_FakePool(), flush_delay_seconds=0.01)
+            await asyncio.gather(*(writer.submit('smartphone', [(i,)], flush) for i in range(100)))
+
+        asyncio.run(main())
+        assert len(flushed) == 1
+        assert sorted(flushed[0]) == [(i,) for i in range(100)]
+
+    def test_full_batches_flush_in_parallel(self):
+        """Test if batches that reach max_batch_rows are flushed right away on separate connections."""
+        pool = _FakePool()
+        async def flush(conn, rows):
+            await asyncio.sleep(0.01)
+
+        async def main():
+            writer = AsyncBatchWriter(pool, max_batch_rows=10, flush_delay_seconds=1)
+            await asyncio.wait_for(asyncio.gather(*(writer.submit('smartphone', [(i,)] * 10, flush) for i in range(5))), timeout=0.5)
+
+        asyncio.run(main())
+        assert pool.max_borrowed == 5
+
+    def test_flush_errors_reach_every_submission(self):
+        """Test if a failed flush raises in every submission that it carried."""
+        async def flush(conn, rows):
+            raise RuntimeError('database unavailable')
+
+        async def main():
+            writer = AsyncBatchWriter(_FakePool(), flush_delay_seconds=0.01)
+            return await asyncio.gather(*(writer.submit('smartphone', [(i,)], flush) for i in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+class TestTransaction:
+    def _write(self, dsn, fail):
+        async def main():
+            pool = AsyncConnectionPool(max_size=1, dsn=dsn)
+            try:
+                async with pool.connection() as conn:
+                    async with transaction(conn):
+                        await execute(conn, "INSERT INTO website (website_name) VALUES ('amazon')")
+                        if fail:
+                            raise RuntimeError('refresh failed')
+            finally:
+                await pool.close()
+        asyncio.run(main())
+
+    def _website_names(self, conn):
+        cur = conn.cursor()
+        cur.execute("SELECT website_name FROM website ORDER BY id")
+        return [row[0] for row in cur.fetchall()]
+
+    def test_commits_on_success(self, postgres_server, postgres_conn):
+        """Test if the statements run inside the transaction are committed together."""
+        self._write(postgres_server.get_uri(), fail=False)
+        assert self._website_names(postgres_conn) == ['flipkart', 'amazon']
+
+    def test_rolls_back_on_error(self, postgres_server, postgres_conn):
+        """Test if an error inside the transaction rolls back the statements that already ran, even though async connections autocommit."""
+        with pytest.raises(RuntimeError):
+            self._write(postgres_server.get_uri(), fail=True)
+        assert self._website_names(postgres_conn) == ['flipkart']
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import pandas as pd
+from ..chart_renderer import BatchChartRenderer, lttb_indices, downsample, chart_file_name
+
+class TestChartRenderer:
+    def test_lttb_keeps_endpoints_and_size(self):
+        """Test if LTTB returns the requested number of sorted indices, including the first and last point."""
+        x = np.arange(1000, dtype=float)
+        indices = lttb_indices(x, np.sin(x / 50), 100)
+        assert len(indices) == 100
+        assert indices[0] == 0 and indices[-1] == 999
+        assert np.all(np.diff(indices) > 0)
+
+    def test_lttb_keeps_spike(self):
+        """Test if a single spike survives downsampling."""
+        y = np.zeros(1000)
+        y[537] = 50
+        assert 537 in lttb_indices(np.arange(1000, dtype=float), y, 20)
+
+    def test_downsample_datetime_keys(self):
+        """Test if series keyed by timestamps can be downsampled."""
+        timestamps = pd.date_range('2024-01-01', periods=300, freq='h', tz='utc')
+        data_dict = dict(zip(timestamps, np.arange(300, dtype=float)))
+        downsampled = downsample(data_dict, 50)
+        assert len(downsampled) == 50
+        assert all(data_dict[key] == value for key, value in downsampled.items())
+
+    def test_chart_file_names_are_unique(self):
+        """Test if names that slugify the same way still get different file names."""
+        assert chart_file_name('Apple iPhone 15 (Black)') != chart_file_name('Apple iPhone 15 [Black]')
+
+    def test_render(self, tmp_path):
+        """Test if every series is written to its own png file."""
+        series = {f"Product {i}": {x: float(x * i) for x in range(20)} for i in range(5)}
+        file_paths = BatchChartRenderer(str(tmp_path), 'x', 'y', max_points=10, max_workers=2, chunk_size=2).render(series)
+        assert len(set(file_paths)) == 5
+        assert all(os.path.isfile(file_path) for file_path in file_paths)
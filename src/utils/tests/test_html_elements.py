@@ -0,0 +1,24 @@
+from ..html_elements import find_elements_by_class_name
+from ..formatter import format_webelements_to_divs
+
+PAGE = """
+<html><body>
+    <div class="KzDlHZ">Apple iPhone 15 <span>(Black, 128 GB)</span></div>
+    <div class="Nx9bqj _4b5DiR">&#8377;69,999</div>
+    <img src="x.png">
+    <div class="KzDlHZ other">SAMSUNG Galaxy S24<br>(Onyx Black, 256 GB)</div>
+    <div class="Nx9bqj">not a price</div>
+    <script>var KzDlHZ = 1;</script>
+</body></html>
+"""
+
+class TestHtmlElements:
+    def test_find_by_class_name(self):
+        """Test if elements are found in document order with their nested text."""
+        titles = format_webelements_to_divs(find_elements_by_class_name(PAGE, 'KzDlHZ'))
+        assert titles == ['Apple iPhone 15 (Black, 128 GB)', 'SAMSUNG Galaxy S24(Onyx Black, 256 GB)']
+
+    def test_find_by_compound_class_name(self):
+        """Test if a dotted class name only matches elements that have every class."""
+        prices = format_webelements_to_divs(find_elements_by_class_name(PAGE, 'Nx9bqj._4b5DiR'))
+        assert prices == ['₹69,999']
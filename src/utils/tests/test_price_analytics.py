@@ -0,0 +1,83 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from .. import schema_manager
+from ..schema_manager import SchemaManager
+from ..price_analytics import PriceAnalytics
+
+WEBSITE_ID = 1 # the flipkart row created by the postgres_conn fixture
+
+class TestPriceAnalytics:
+    @pytest.fixture
+    def analytics(self, postgres_conn):
+        """Fixture to create the rollup tables in a fresh database and return a PriceAnalytics bound to it."""
+        schema_manager._ensured_rollup_tables.clear()
+        SchemaManager(postgres_conn.cursor(), postgres_conn).ensure_rollup_tables('smartphone')
+        yield PriceAnalytics(postgres_conn.cursor(), postgres_conn)
+        schema_manager._ensured_rollup_tables.clear()
+
+    def _submit(self, analytics, *observations):
+        analytics.refresh_for_batch('smartphone', [(WEBSITE_ID, product_name, price, observed_at) for product_name, price, observed_at in observations])
+        analytics.conn.commit()
+
+    def test_unchanged_prices_still_count(self, analytics):
+        """Test if every observation is counted, including days on which the price did not move."""
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-01T10:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-02T10:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-02T16:00:00+00:00'))
+        summary = analytics.daily_summary('smartphone', 'Phone A')
+        assert list(summary['day']) == [date(2024, 5, 1), date(2024, 5, 2)]
+        assert list(summary['sample_count']) == [1, 2]
+        stats = analytics.product_stats('smartphone', 'Phone A').iloc[0]
+        assert stats['sample_count'] == 3
+        assert stats['avg_usd'] == Decimal('100.00')
+
+    def test_daily_ohlc(self, analytics):
+        """Test if open and close follow observation time, even when batches arrive out of order."""
+        self._submit(analytics, ('Phone A', '105.00', '2024-05-01T12:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-01T08:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '120.00', '2024-05-01T14:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '90.00', '2024-05-01T20:00:00+00:00'))
+        row = analytics.daily_summary('smartphone', 'Phone A').iloc[0]
+        assert (row['open_usd'], row['high_usd'], row['low_usd'], row['close_usd']) == (100, 120, 90, 90)
+
+    def test_average_is_over_observations(self, analytics):
+        """Test if the average weighs each observation rather than each distinct price."""
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-01T08:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-01T12:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '100.00', '2024-05-02T08:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '200.00', '2024-05-03T08:00:00+00:00'))
+        stats = analytics.product_stats('smartphone', 'Phone A').iloc[0]
+        assert stats['avg_usd'] == Decimal('125.00')
+        assert (stats['min_usd'], stats['max_usd'], stats['last_price_usd']) == (100, 200, 200)
+        assert (stats['first_day'], stats['last_day']) == (date(2024, 5, 1), date(2024, 5, 3))
+
+    def test_retried_batch_is_not_double_counted(self, analytics):
+        """Test if submitting the same batch twice leaves the rollups unchanged."""
+        batch = [('Phone A', '100.00', '2024-05-01T08:00:00+00:00'), ('Phone B', '50.00', '2024-05-01T08:00:00+00:00')]
+        self._submit(analytics, *batch)
+        self._submit(analytics, *batch)
+        stats = analytics.product_stats('smartphone').set_index('product_name')
+        assert list(stats['sample_count']) == [1, 1]
+
+    def test_refresh_does_not_commit(self, analytics):
+        """Test if a refresh that the caller rolls back leaves no trace, so it can share a transaction with the history write."""
+        analytics.refresh_for_batch('smartphone', [(WEBSITE_ID, 'Phone A', '100.00', '2024-05-01T08:00:00+00:00')])
+        analytics.conn.rollback()
+        assert analytics.product_stats('smartphone').empty
+
+    def test_largest_price_drops(self, analytics):
+        """Test if drops are measured from the peak within the window, ordered by the largest drop first."""
+        self._submit(analytics, ('Phone A', '300.00', '2024-05-01T08:00:00+00:00'), ('Phone B', '100.00', '2024-05-01T08:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '250.00', '2024-05-02T08:00:00+00:00'), ('Phone B', '90.00', '2024-05-02T08:00:00+00:00'))
+        drops = analytics.largest_price_drops('smartphone', date(2024, 5, 1))
+        assert list(drops['product_name']) == ['Phone A', 'Phone B']
+        assert list(drops['drop_usd']) == [50, 10]
+
+    def test_largest_price_drops_counts_carried_in_price(self, analytics):
+        """Test if the last price before the window counts as a peak when the window only holds lower prices."""
+        self._submit(analytics, ('Phone A', '300.00', '2024-04-20T08:00:00+00:00'))
+        self._submit(analytics, ('Phone A', '200.00', '2024-05-02T08:00:00+00:00'))
+        drops = analytics.largest_price_drops('smartphone', date(2024, 5, 1))
+        assert drops.iloc[0]['peak_usd'] == 300
+        assert drops.iloc[0]['drop_usd'] == 100
@@ -0,0 +1,133 @@
+import pytest
+from datetime import date, datetime, timezone
+from .. import schema_manager
+from ..schema_manager import SchemaManager, is_ensured, _add_months
+
+class _RecordingCursor:
+    """A stand-in for a psycopg2 cursor that records executed statements and reports every table as missing."""
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+    def fetchone(self):
+        return None
+
+class _NoopConnection:
+    def commit(self):
+        pass
+
+class TestSchemaManager:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Fixture to reset the per-process table cache between tests."""
+        schema_manager._ensured_tables.clear()
+        schema_manager._ensured_latest_tables.clear()
+        schema_manager._ensured_rollup_tables.clear()
+
+    def test_add_months(self):
+        """Test if month arithmetic rolls over year boundaries."""
+        assert _add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+        assert _add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+    def test_creates_partitions_ahead(self):
+        """Test if the current month and the months ahead each get a partition."""
+        cur = _RecordingCursor()
+        SchemaManager(cur, _NoopConnection(), months_ahead=2).ensure_table('smartphone', datetime(2024, 12, 15, tzinfo=timezone.utc))
+        statements = ' '.join(cur.statements)
+        assert 'PARTITION BY RANGE (datetime)' in statements
+        for partition in ('smartphone_y2024m12', 'smartphone_y2025m01', 'smartphone_y2025m02'):
+            assert partition in statements
+
+    def test_cached_table_skips_catalog(self):
+        """Test if a second call within the partition horizon runs no queries."""
+        now = datetime(2024, 12, 15, tzinfo=timezone.utc)
+        SchemaManager(_RecordingCursor(), _NoopConnection()).ensure_table('smartphone', now)
+        cur = _RecordingCursor()
+        SchemaManager(cur, _NoopConnection()).ensure_table('smartphone', now)
+        assert cur.statements == []
+
+    def test_horizon_moves_forward(self):
+        """Test if crossing into a new month creates the next partition."""
+        SchemaManager(_RecordingCursor(), _NoopConnection(), months_ahead=1).ensure_table('smartphone', datetime(2024, 12, 15, tzinfo=timezone.utc))
+        cur = _RecordingCursor()
+        SchemaManager(cur, _NoopConnection(), months_ahead=1).ensure_table('smartphone', datetime(2025, 1, 2, tzinfo=timezone.utc))
+        assert any('smartphone_y2025m02' in statement for statement in cur.statements)
+
+class TestSchemaManagerPostgres:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Fixture to reset the per-process table cache between tests."""
+        schema_manager._ensured_tables.clear()
+
+    def _count_rows(self, conn, product_type):
+        cur = conn.cursor()
+        cur.execute(f"SELECT count(*) FROM {product_type};")
+        return cur.fetchone()[0]
+
+    def test_retried_append_inserts_nothing_twice(self, postgres_conn):
+        """Test if inserting the same batch again is a no-op once the observation key exists."""
+        cur = postgres_conn.cursor()
+        SchemaManager(cur, postgres_conn).ensure_table('smartphone')
+        for _ in range(2):
+            cur.execute("INSERT INTO smartphone (website_id, product_name, price_usd, datetime) VALUES (1, 'P1', 10, now()::date) ON CONFLICT DO NOTHING;")
+        postgres_conn.commit()
+        assert self._count_rows(postgres_conn, 'smartphone') == 1
+
+    def test_duplicate_rows_do_not_block_setup(self, postgres_conn):
+        """Test if a legacy table that already holds duplicates still gets set up, without the observation key."""
+        cur = postgres_conn.cursor()
+        cur.execute("CREATE TABLE smartphone (id SERIAL PRIMARY KEY, website_id integer, product_name varchar, price_usd numeric, datetime timestamptz);")
+        cur.execute("INSERT INTO smartphone (website_id, product_name, price_usd, datetime) VALUES (1, 'P1', 10, '2024-01-01'), (1, 'P1', 10, '2024-01-01');")
+        postgres_conn.commit()
+        SchemaManager(cur, postgres_conn).ensure_table('smartphone')
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'smartphone';")
+        index_names = {row[0] for row in cur.fetchall()}
+        assert 'smartphone_product_name_datetime_idx' in index_names
+        assert 'smartphone_observation_key' not in index_names
+
+    def test_repeated_table_creation_is_tolerated(self, postgres_conn):
+        """Test if creating the partitioned table again, as a concurrent worker that lost the race would, does not fail."""
+        cur = postgres_conn.cursor()
+        manager = SchemaManager(cur, postgres_conn)
+        manager._create_partitioned_table('smartphone')
+        manager._create_partitioned_table('smartphone')
+        postgres_conn.commit()
+        assert manager._table_kind('smartphone_default') == 'r'
+
+    def test_rows_in_default_partition_move_to_new_partition(self, postgres_conn):
+        """Test if moving the horizon over a range that already has rows in the default partition moves them instead of failing."""
+        cur = postgres_conn.cursor()
+        SchemaManager(cur, postgres_conn, months_ahead=1).ensure_table('smartphone', datetime(2024, 12, 15, tzinfo=timezone.utc))
+        cur.execute("INSERT INTO smartphone (website_id, product_name, price_usd, datetime) VALUES (1, 'P1', 10, '2025-03-10 00:00:00+00');")
+        postgres_conn.commit()
+        SchemaManager(cur, postgres_conn, months_ahead=1).ensure_table('smartphone', datetime(2025, 2, 2, tzinfo=timezone.utc))
+        assert self._count_rows(postgres_conn, 'smartphone_default') == 0
+        assert self._count_rows(postgres_conn, 'smartphone_y2025m03') == 1
+        assert self._count_rows(postgres_conn, 'smartphone') == 1
+
+class TestIsEnsured:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Fixture to reset the per-process table cache between tests."""
+        schema_manager._ensured_tables.clear()
+        schema_manager._ensured_latest_tables.clear()
+        schema_manager._ensured_rollup_tables.clear()
+
+    def test_follows_the_partition_horizon(self):
+        """Test if a table counts as ensured until the month its partition horizon has to move."""
+        manager = SchemaManager(_RecordingCursor(), _NoopConnection(), months_ahead=1)
+        assert not is_ensured('smartphone', months_ahead=1, now=datetime(2024, 12, 15, tzinfo=timezone.utc))
+        manager.ensure_table('smartphone', datetime(2024, 12, 15, tzinfo=timezone.utc))
+        assert is_ensured('smartphone', months_ahead=1, now=datetime(2024, 12, 31, tzinfo=timezone.utc))
+        assert not is_ensured('smartphone', months_ahead=1, now=datetime(2025, 1, 2, tzinfo=timezone.utc))
+
+    def test_requires_requested_tables(self):
+        """Test if the latest and rollup tables are only required when asked for."""
+        now = datetime(2024, 12, 15, tzinfo=timezone.utc)
+        manager = SchemaManager(_RecordingCursor(), _NoopConnection())
+        manager.ensure_table('smartphone', now)
+        manager.ensure_rollup_tables('smartphone')
+        assert is_ensured('smartphone', rollup_tables=True, now=now)
+        assert not is_ensured('smartphone', latest_table=True, rollup_tables=True, now=now)
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import threading
+import multiprocessing
+from ..snapshot_store import SnapshotStore
+
+class TestSnapshotStore:
+    def test_put_and_get(self, tmp_path):
+        """Test if stored content round trips through compression."""
+        store = SnapshotStore(str(tmp_path))
+        digest = store.put('<html>price</html>', {'search_keyword': 'apple iphone'})
+        assert store.get(digest) == b'<html>price</html>'
+        assert [record['metadata']['search_keyword'] for record in store.records()] == ['apple iphone']
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """Test if identical content shares one object but gets one index record per put."""
+        store = SnapshotStore(str(tmp_path))
+        first_digest = store.put('<html></html>', {'run': 1})
+        second_digest = store.put('<html></html>', {'run': 2})
+        assert first_digest == second_digest
+        assert len(list(store.records())) == 2
+        assert len(os.listdir(os.path.join(str(tmp_path), 'objects', first_digest[:2]))) == 1
+
+    def test_prune_by_age(self, tmp_path):
+        """Test if records past the retention age are dropped along with their unreferenced objects."""
+        store = SnapshotStore(str(tmp_path), max_age_days=30)
+        old_digest = store.put('old page', {})
+        new_digest = store.put('new page', {})
+        records = list(store.records())
+        records[0]['stored_at'] = '2000-01-01T00:00:00+00:00'
+        with open(store.index_path, 'w') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+        assert store.prune() == 1
+        assert [record['digest'] for record in store.records()] == [new_digest]
+        assert not os.path.exists(store._object_path(old_digest))
+
+    def test_prune_by_size(self, tmp_path):
+        """Test if the oldest records are dropped until the objects fit in the size limit."""
+        store = SnapshotStore(str(tmp_path), max_age_days=None)
+        store.put(os.urandom(1000), {})
+        newest_digest = store.put(os.urandom(1000), {})
+        store.max_total_bytes = 1500
+        assert store.prune() == 1
+        assert [record['digest'] for record in store.records()] == [newest_digest]
+
+    def _age_first_record(self, store):
+        records = list(store.records())
+        records[0]['stored_at'] = '2000-01-01T00:00:00+00:00'
+        with open(store.index_path, 'w') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+
+    def test_put_prunes_when_due(self, tmp_path):
+        """Test if a put applies the retention policy once the prune interval has passed since the last prune."""
+        store = SnapshotStore(str(tmp_path), max_age_days=30, prune_interval_seconds=3600)
+        store.put('old page', {})
+        self._age_first_record(store)
+        two_hours_ago = time.time() - 7200
+        os.utime(store.last_prune_path, (two_hours_ago, two_hours_ago))
+        new_digest = store.put('new page', {})
+        assert [record['digest'] for record in store.records()] == [new_digest]
+
+    def test_put_skips_prune_within_interval(self, tmp_path):
+        """Test if a put leaves the store alone when it was pruned recently."""
+        store = SnapshotStore(str(tmp_path), max_age_days=30, prune_interval_seconds=3600)
+        store.put('old page', {})
+        self._age_first_record(store)
+        store.put('new page', {})
+        assert len(list(store.records())) == 2
+
+def _hold_lock(root_path, locked, release):
+    with SnapshotStore(root_path)._locked():
+        locked.set()
+        release.wait(5)
+
+class TestSnapshotStoreLocking:
+    def test_put_waits_for_lock_held_by_another_process(self, tmp_path):
+        """Test if put blocks while another process, e.g. `replay --prune`, holds the store lock."""
+        locked, release = multiprocessing.Event(), multiprocessing.Event()
+        process = multiprocessing.Process(target=_hold_lock, args=(str(tmp_path), locked, release))
+        process.start()
+        try:
+            assert locked.wait(5)
+            threading.Timer(0.3, release.set).start()
+            start_time = time.perf_counter()
+            SnapshotStore(str(tmp_path)).put('<html></html>', {})
+            assert time.perf_counter() - start_time >= 0.25
+        finally:
+            release.set()
+            process.join(5)